@@ -1,21 +1,324 @@
 import os
-from flask import Flask, jsonify, request
+import gzip
+import json
+import time
+import queue
+import hashlib
+from datetime import datetime, timezone
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-from services.stock_service import StockService, RateLimitException
-from services.prediction_service import PredictionService
+from werkzeug.http import is_resource_modified
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from services.stock_service import StockService, RateLimitException, PERIODS
+from services.backends import create_rate_limiter, parse_rate_limit
+from services.prediction_service import PredictionService, PREDICTION_MODES, MAX_MONTE_CARLO_PATHS
 from services.analysis_service import AnalysisService
+from services.http_client import upstream_stats
+from services.live_hub import LivePriceHub
+from services.screener_service import ScreenerService, SCREENER_FIELDS
+from services.prefetcher import Prefetcher
+from services.metrics import REGISTRY, stage, start_request_timing, request_timings, finish_request_timing, server_timing_header
 
 app = Flask(__name__)
 CORS(app)
 
+MAX_BATCH_SYMBOLS = 25
+# The screener only reads stored histories, so it takes larger lists.
+MAX_SCREENER_SYMBOLS = 200
+
 stock_service = StockService()
 prediction_service = PredictionService()
 analysis_service = AnalysisService()
+live_hub = LivePriceHub(stock_service)
+prefetcher = Prefetcher(stock_service)
+screener_service = ScreenerService(stock_service, prefetcher)
+
+# ---------------- Worker Lifecycle ----------------
+
+# With STOCK_PRELOAD=1 (gunicorn.conf.py sets preload_app from it) this
+# module is imported once in the gunicorn master and the workers are forked
+# from it, sharing the instrument index and the lazily imported parsers
+# copy-on-write. Threads do not survive a fork, so background work is then
+# started in each worker by the post_fork hook rather than at import.
+PRELOAD = os.environ.get('STOCK_PRELOAD', '0') == '1'
+
+
+def preload_shared_state():
+    stock_service.preload()
+    analysis_service.preload()
+
+
+def start_background_work():
+    # Warm popular and frequently requested histories in the background;
+    # STOCK_PREFETCH=0 turns it off.
+    if os.environ.get('STOCK_PREFETCH', '1') != '0':
+        prefetcher.start()
+
+
+if PRELOAD:
+    preload_shared_state()
+else:
+    start_background_work()
+
+# ---------------- Metrics ----------------
+
+# STOCK_SERVER_TIMING=1 adds a Server-Timing header with the per-stage
+# breakdown of each request (download, parse, indicators, model calls).
+SERVER_TIMING = os.environ.get('STOCK_SERVER_TIMING', '0') == '1'
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "stockapp_http_request_duration_seconds", "Time to produce a response, per route.", ("route", "method")
+)
+REQUESTS_TOTAL = REGISTRY.counter(
+    "stockapp_http_requests_total", "Responses sent, per route and status code.", ("route", "method", "status")
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "stockapp_http_requests_in_flight", "Requests currently being handled, per route.", ("route",)
+)
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+@app.before_request
+def _start_request_metrics():
+    g.request_start = time.perf_counter()
+    g.timing_token = start_request_timing()
+    REQUESTS_IN_FLIGHT.inc(route=_route())
+
+
+@app.after_request
+def _record_request_metrics(response):
+    elapsed = time.perf_counter() - g.request_start
+    route = _route()
+    REQUEST_SECONDS.observe(elapsed, route=route, method=request.method)
+    REQUESTS_TOTAL.inc(route=route, method=request.method, status=response.status_code)
+    if SERVER_TIMING:
+        response.headers['Server-Timing'] = server_timing_header(request_timings(), elapsed)
+    return response
+
+
+@app.teardown_request
+def _finish_request_metrics(error=None):
+    if 'timing_token' in g:
+        REQUESTS_IN_FLIGHT.dec(route=_route())
+        finish_request_timing(g.pop('timing_token'))
+
+
+@REGISTRY.collector
+def _collect_service_metrics():
+    caches = {
+        "stock": stock_service.cache.stats(),
+        "prediction": prediction_service.cache.stats(),
+        "sentiment": prediction_service.sentiment_cache.stats(),
+        "analysis": analysis_service.cache.stats(),
+    }
+    upstreams = upstream_stats()
+    live = live_hub.stats()
+    prefetch = prefetcher.stats()
+    return [
+        ("stockapp_cache_hits_total", "counter", "Cache lookups that found a value.",
+         [({"cache": name}, stats["hits"]) for name, stats in caches.items()]),
+        ("stockapp_cache_misses_total", "counter", "Cache lookups that found nothing.",
+         [({"cache": name}, stats["misses"]) for name, stats in caches.items()]),
+        ("stockapp_cache_hit_ratio", "gauge", "Hits divided by lookups since start.",
+         [({"cache": name}, stats["hitRatio"]) for name, stats in caches.items()]),
+        ("stockapp_cache_entries", "gauge", "Entries currently cached.",
+         [({"cache": name}, stats["entries"]) for name, stats in caches.items()]),
+        ("stockapp_cache_bytes", "gauge", "Estimated size of cached values.",
+         [({"cache": name}, stats["bytes"]) for name, stats in caches.items()]),
+        ("stockapp_cache_evictions_total", "counter", "Entries evicted to stay within limits.",
+         [({"cache": name}, stats["evictions"]) for name, stats in caches.items()]),
+        ("stockapp_upstream_responses_total", "counter",
+         "Upstream attempts by outcome: HTTP status code, or 'error' for connection errors and timeouts.",
+         [({"upstream": name, "status": status}, count)
+          for name, stats in upstreams.items() for status, count in stats["statusCounts"].items()]),
+        ("stockapp_upstream_retries_total", "counter", "Upstream attempts that were retries.",
+         [({"upstream": name}, stats["retries"]) for name, stats in upstreams.items()]),
+        ("stockapp_upstream_rejected_total", "counter", "Calls refused because the circuit was open.",
+         [({"upstream": name}, stats["rejected"]) for name, stats in upstreams.items()]),
+        ("stockapp_upstream_rate_limited_total", "counter", "Calls refused by the per-upstream rate limit.",
+         [({"upstream": name}, stats["limited"]) for name, stats in upstreams.items()]),
+        ("stockapp_upstream_circuit_open", "gauge", "1 while the upstream circuit breaker is not closed.",
+         [({"upstream": name}, int(stats["circuit"] != "closed")) for name, stats in upstreams.items()]),
+        ("stockapp_live_stream_subscribers", "gauge", "Connected live-price stream clients.",
+         [({}, live["subscribers"])]),
+        ("stockapp_live_streams_rejected_total", "counter", "Stream requests refused at STOCK_MAX_STREAMS or STOCK_MAX_ASYNC_STREAMS.",
+         [({}, live["rejected"])]),
+        ("stockapp_prefetch_queue_length", "gauge", "Symbols waiting for a background refresh.",
+         [({}, len(prefetch["queue"]))]),
+        ("stockapp_prefetch_fetches_total", "counter", "Background refreshes by outcome.",
+         [({"outcome": outcome}, prefetch[outcome]) for outcome in ("fetched", "failed", "deferred")]),
+        ("stockapp_client_rate_limited_total", "counter", "API requests refused by the per-client rate limit.",
+         [({}, client_limiter.limited)] if client_limiter is not None else []),
+    ]
+
+
+# ---------------- Rate Limits ----------------
+
+# STOCK_CLIENT_RATE_LIMIT caps API requests per client IP ("calls/seconds",
+# default 120/60; 0 disables). Upstream calls have their own per-upstream
+# budget (STOCK_UPSTREAM_RATE_LIMITS, see services/http_client.py). Behind
+# STOCK_PROXY_COUNT trusted proxies the client address is read from
+# X-Forwarded-For.
+CLIENT_RATE_LIMIT = parse_rate_limit(os.environ.get('STOCK_CLIENT_RATE_LIMIT', '120/60'))
+PROXY_COUNT = int(os.environ.get('STOCK_PROXY_COUNT', 0))
+UNLIMITED_PATHS = {'/api/health', '/metrics'}
+
+client_limiter = create_rate_limiter(*CLIENT_RATE_LIMIT) if CLIENT_RATE_LIMIT else None
+
+
+def _client_ip(req):
+    forwarded = [addr.strip() for addr in req.headers.get('X-Forwarded-For', '').split(',') if addr.strip()]
+    if PROXY_COUNT and len(forwarded) >= PROXY_COUNT:
+        return forwarded[-PROXY_COUNT]
+    return req.remote_addr or 'unknown'
+
+
+def _client_over_limit(req):
+    # A RateLimitException when this client is over its limit, else None.
+    if client_limiter is None or req.path in UNLIMITED_PATHS:
+        return None
+    wait = client_limiter.acquire(f"client:{_client_ip(req)}")
+    if wait:
+        return RateLimitException("Too many requests from this client", retry_after=wait)
+    return None
+
+
+def _rate_limited(e):
+    response = jsonify({
+        "error": "Rate limit exceeded",
+        "details": str(e)
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(e.retry_seconds)
+    return response
+
+
+def _invalid_symbol(e):
+    # Malformed symbols (rejected by the history store) can never succeed,
+    # so they are a client error rather than an upstream outage.
+    return jsonify({
+        "error": "Invalid symbol",
+        "details": str(e)
+    }), 400
+
+
+@app.before_request
+def _limit_client():
+    e = _client_over_limit(request)
+    if e is not None:
+        return _rate_limited(e)
+
+# ---------------- HTTP Caching ----------------
+
+# Bump to invalidate every ETag handed out so far (e.g. after a payload
+# format change).
+API_VERSION = "1"
+HISTORY_FORMATS = ("records", "columnar")
+
+# Responses of at least STOCK_COMPRESS_MIN_BYTES are compressed with brotli
+# (when installed) or gzip if the client accepts it; STOCK_COMPRESSION=0
+# leaves compression to a proxy.
+COMPRESSION = os.environ.get('STOCK_COMPRESSION', '1') != '0'
+COMPRESS_MIN_BYTES = int(os.environ.get('STOCK_COMPRESS_MIN_BYTES', 1024))
+
+
+def _etag(*parts):
+    return hashlib.sha1(":".join([API_VERSION, *map(str, parts)]).encode()).hexdigest()[:20]
+
+
+def _not_modified(etag, last_modified=None):
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _conditional_json(build, etag=None, last_modified=None):
+    # With a precomputed etag, build() (and serialization) is skipped for
+    # clients that already have this version. Without one the ETag is a hash
+    # of the body, which still saves the transfer.
+    if etag is not None and not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return _not_modified(etag, last_modified)
+
+    response = jsonify(build())
+    if etag is None:
+        etag = hashlib.sha1(response.get_data()).hexdigest()[:20]
+        if not is_resource_modified(request.environ, etag=etag):
+            return _not_modified(etag)
+
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.after_request
+def _compress_response(response):
+    if (not COMPRESSION or response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    accepted = request.accept_encodings
+    if response.content_length is None or response.content_length < COMPRESS_MIN_BYTES:
+        return response
+    if brotli is not None and accepted['br']:
+        response.set_data(brotli.compress(response.get_data(), quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif accepted['gzip']:
+        response.set_data(gzip.compress(response.get_data(), compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def _history_format():
+    history_format = request.args.get('format', 'records')
+    return history_format if history_format in HISTORY_FORMATS else None
+
+
+def _stock_json(data, history_format="records"):
+    # History stays column-oriented inside the services; it is turned into
+    # a list of records (or parallel arrays) only here, when the response is
+    # serialized.
+    with stage("serialize"):
+        history = data["history"]
+        return {**data, "history": history.to_columns() if history_format == "columnar" else history.to_records()}
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "healthy", "message": "API is running"})
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    return jsonify({
+        "cache": {
+            "stock": stock_service.cache.stats(),
+            "prediction": prediction_service.cache.stats(),
+            "sentiment": prediction_service.sentiment_cache.stats(),
+            "analysis": analysis_service.cache.stats()
+        },
+        "upstreams": upstream_stats(),
+        "liveStreams": live_hub.stats(),
+        "prefetch": prefetcher.stats(),
+        "clientRateLimit": client_limiter.stats() if client_limiter is not None else None
+    })
+
 @app.route('/api/stock/search', methods=['GET'])
 def search_stocks():
     query = request.args.get('q', '')
@@ -23,13 +326,11 @@ def search_stocks():
         return jsonify({"error": "Query parameter 'q' is required"}), 400
     
     try:
-        results = stock_service.search_stocks(query)
+        exchange = request.args.get('exchange', '').upper() or None
+        results = stock_service.search_stocks(query, exchange)
         return jsonify({"results": results})
     except RateLimitException as e:
-        return jsonify({
-            "error": "Rate limit exceeded",
-            "details": str(e)
-        }), 429
+        return _rate_limited(e)
     except Exception as e:
         return jsonify({
             "error": "External data provider unavailable",
@@ -39,48 +340,201 @@ def search_stocks():
 @app.route('/api/stock/<symbol>', methods=['GET'])
 def get_stock_data(symbol):
     period = request.args.get('period', '1mo')
+    if period not in PERIODS:
+        return jsonify({
+            "error": f"Unsupported period '{period}'",
+            "details": f"Supported periods: {', '.join(PERIODS)}"
+        }), 400
+
+    history_format = _history_format()
+    if history_format is None:
+        return jsonify({
+            "error": f"Unsupported format '{request.args.get('format')}'",
+            "details": f"Supported formats: {', '.join(HISTORY_FORMATS)}"
+        }), 400
+
     try:
         data = stock_service.get_stock_data(symbol, period)
-        return jsonify(data)
+        age = stock_service.bars_age(symbol)
+        fetched_at = datetime.fromtimestamp(time.time() - age, timezone.utc) if age is not None else None
+        etag = _etag(symbol, period, history_format, data["history"].fingerprint())
+        return _conditional_json(lambda: _stock_json(data, history_format), etag, fetched_at)
     except RateLimitException as e:
-        return jsonify({
-            "error": "Rate limit exceeded",
-            "details": str(e)
-        }), 429
+        return _rate_limited(e)
+    except ValueError as e:
+        return _invalid_symbol(e)
     except Exception as e:
         return jsonify({
             "error": "External data provider unavailable",
             "details": str(e)
         }), 503
 
+@app.route('/api/stocks', methods=['GET'])
+def get_stocks_batch():
+    symbols = [s.strip() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    symbols = list(dict.fromkeys(symbols))
+    period = request.args.get('period', '1mo')
+    if not symbols:
+        return jsonify({"error": "Query parameter 'symbols' is required"}), 400
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        return jsonify({
+            "error": "Too many symbols",
+            "details": f"At most {MAX_BATCH_SYMBOLS} symbols per request"
+        }), 400
+    if period not in PERIODS:
+        return jsonify({
+            "error": f"Unsupported period '{period}'",
+            "details": f"Supported periods: {', '.join(PERIODS)}"
+        }), 400
+    history_format = _history_format()
+    if history_format is None:
+        return jsonify({
+            "error": f"Unsupported format '{request.args.get('format')}'",
+            "details": f"Supported formats: {', '.join(HISTORY_FORMATS)}"
+        }), 400
+
+    results, errors = stock_service.get_many(symbols, period)
+    etag = _etag(
+        period, history_format,
+        *(f"{symbol}={data['history'].fingerprint()}" for symbol, data in sorted(results.items())),
+        json.dumps(errors, sort_keys=True)
+    )
+    return _conditional_json(lambda: {
+        "results": {symbol: _stock_json(data, history_format) for symbol, data in results.items()},
+        "errors": errors
+    }, etag)
+
 @app.route('/api/stock/<symbol>/live', methods=['GET'])
 def get_live_price(symbol):
     try:
         data = stock_service.get_live_price(symbol)
         return jsonify(data)
     except RateLimitException as e:
-        return jsonify({
-            "error": "Rate limit exceeded",
-            "details": str(e)
-        }), 429
+        return _rate_limited(e)
+    except ValueError as e:
+        return _invalid_symbol(e)
     except Exception as e:
         return jsonify({
             "error": "External data provider unavailable",
             "details": str(e)
         }), 503
 
+@app.route('/api/stock/<symbol>/stream', methods=['GET'])
+def stream_live_price(symbol):
+    subscription = live_hub.subscribe(symbol)
+    if subscription is None:
+        response = jsonify({
+            "error": "Too many open streams",
+            "details": f"Poll /api/stock/{symbol}/live instead"
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(int(live_hub.interval))
+        return response
+
+    def events():
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event, data = subscription.get(timeout=15)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    response = Response(events(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+    # The server closes the response when the client goes away, and also
+    # for HEAD requests whose body is never iterated.
+    response.call_on_close(lambda: live_hub.unsubscribe(symbol, subscription))
+    return response
+
 @app.route('/api/stock/<symbol>/predict', methods=['GET'])
 def predict_stock(symbol):
     days = request.args.get('days', 7, type=int)
+    mode = request.args.get('mode', 'walk')
+    paths = request.args.get('paths', 10000, type=int)
+    seed = request.args.get('seed', 0, type=int)
+    if mode not in PREDICTION_MODES:
+        return jsonify({
+            "error": f"Unsupported mode '{mode}'",
+            "details": f"Supported modes: {', '.join(PREDICTION_MODES)}"
+        }), 400
+    if mode == 'montecarlo' and not (1 <= paths <= MAX_MONTE_CARLO_PATHS and 1 <= days <= 90):
+        return jsonify({
+            "error": "Invalid Monte Carlo parameters",
+            "details": f"paths must be 1-{MAX_MONTE_CARLO_PATHS} and days 1-90"
+        }), 400
+
     try:
         stock_data = stock_service.get_stock_data(symbol, '3mo')
-        prediction = prediction_service.predict(symbol, stock_data, days)
-        return jsonify(prediction)
+        indicators = stock_service.get_indicator_state(symbol).latest()
+        prediction = prediction_service.predict(
+            symbol, stock_data, days, indicators, mode=mode, paths=paths, seed=seed
+        )
+        return _conditional_json(lambda: prediction)
     except RateLimitException as e:
+        return _rate_limited(e)
+    except ValueError as e:
+        return _invalid_symbol(e)
+    except Exception as e:
         return jsonify({
-            "error": "Rate limit exceeded",
+            "error": "External data provider unavailable",
             "details": str(e)
-        }), 429
+        }), 503
+
+@app.route('/api/predictions', methods=['GET'])
+def predict_stocks_batch():
+    symbols = [s.strip() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    symbols = list(dict.fromkeys(symbols))
+    days = request.args.get('days', 7, type=int)
+    mode = request.args.get('mode', 'walk')
+    paths = request.args.get('paths', 10000, type=int)
+    seed = request.args.get('seed', 0, type=int)
+    if not symbols:
+        return jsonify({"error": "Query parameter 'symbols' is required"}), 400
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        return jsonify({
+            "error": "Too many symbols",
+            "details": f"At most {MAX_BATCH_SYMBOLS} symbols per request"
+        }), 400
+    if mode not in PREDICTION_MODES:
+        return jsonify({
+            "error": f"Unsupported mode '{mode}'",
+            "details": f"Supported modes: {', '.join(PREDICTION_MODES)}"
+        }), 400
+    if mode == 'montecarlo' and not (1 <= paths <= MAX_MONTE_CARLO_PATHS and 1 <= days <= 90):
+        return jsonify({
+            "error": "Invalid Monte Carlo parameters",
+            "details": f"paths must be 1-{MAX_MONTE_CARLO_PATHS} and days 1-90"
+        }), 400
+
+    # One batched sentiment call covers every symbol that needs a new prediction.
+    stocks, errors = stock_service.get_many(symbols, '3mo')
+    indicators = {symbol: stock_service.get_indicator_state(symbol).latest() for symbol in stocks}
+    results, prediction_errors = prediction_service.predict_many(
+        stocks, days, indicators, mode=mode, paths=paths, seed=seed
+    )
+    errors.update(prediction_errors)
+    return _conditional_json(lambda: {"results": results, "errors": errors})
+
+@app.route('/api/stock/<symbol>/indicators', methods=['GET'])
+def get_indicators(symbol):
+    period = request.args.get('period', '3mo')
+    if period not in PERIODS:
+        return jsonify({
+            "error": f"Unsupported period '{period}'",
+            "details": f"Supported periods: {', '.join(PERIODS)}"
+        }), 400
+
+    try:
+        indicators = stock_service.get_indicators(symbol, period)
+        return _conditional_json(lambda: indicators)
+    except RateLimitException as e:
+        return _rate_limited(e)
+    except ValueError as e:
+        return _invalid_symbol(e)
     except Exception as e:
         return jsonify({
             "error": "External data provider unavailable",
@@ -92,28 +546,68 @@ def analyze_stock(symbol):
     try:
         stock_data = stock_service.get_stock_data(symbol, '3mo')
         analysis = analysis_service.analyze(symbol, stock_data)
-        return jsonify(analysis)
+        return _conditional_json(lambda: analysis)
     except RateLimitException as e:
+        return _rate_limited(e)
+    except ValueError as e:
+        return _invalid_symbol(e)
+    except Exception as e:
         return jsonify({
-            "error": "Rate limit exceeded",
+            "error": "External data provider unavailable",
             "details": str(e)
-        }), 429
+        }), 503
+
+@app.route('/api/screener', methods=['GET'])
+def screen_stocks():
+    symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    sort = request.args.get('sort', 'rsi')
+    order = request.args.get('order', 'desc')
+    limit = request.args.get('limit', 50, type=int)
+    if sort not in SCREENER_FIELDS or order not in ('asc', 'desc'):
+        return jsonify({
+            "error": "Invalid sort",
+            "details": f"sort must be one of {', '.join(SCREENER_FIELDS)} and order asc or desc"
+        }), 400
+    if len(symbols) > MAX_SCREENER_SYMBOLS:
+        return jsonify({
+            "error": "Too many symbols",
+            "details": f"At most {MAX_SCREENER_SYMBOLS} symbols per request"
+        }), 400
+    if limit is None or not 1 <= limit <= MAX_SCREENER_SYMBOLS:
+        return jsonify({
+            "error": "Invalid limit",
+            "details": f"limit must be 1-{MAX_SCREENER_SYMBOLS}"
+        }), 400
+
+    filters = {}
+    for field in SCREENER_FIELDS:
+        for bound in ('min', 'max'):
+            value = request.args.get(f'{bound}_{field}', type=float)
+            if value is not None:
+                filters[(field, bound)] = value
+
+    try:
+        return jsonify(screener_service.screen(symbols or None, sort, order, filters, limit))
     except Exception as e:
         return jsonify({
-            "error": "External data provider unavailable",
+            "error": "Screener unavailable",
             "details": str(e)
         }), 503
 
+@app.route('/api/analysis/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    job = analysis_service.get_analysis_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown analysis job"}), 404
+    return jsonify(job)
+
 @app.route('/api/nse/stocks', methods=['GET'])
 def get_nse_stocks():
     try:
         stocks = stock_service.get_nse_stocks()
         return jsonify({"stocks": stocks})
     except RateLimitException as e:
-        return jsonify({
-            "error": "Rate limit exceeded",
-            "details": str(e)
-        }), 429
+        return _rate_limited(e)
     except Exception as e:
         return jsonify({
             "error": "External data provider unavailable",
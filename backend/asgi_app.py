@@ -0,0 +1,376 @@
+import os
+import gzip
+import json
+import time
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from quart import Quart, Response, g, jsonify, request
+from quart.wrappers.response import IterableBody
+from werkzeug.exceptions import HTTPException
+from werkzeug.sansio.http import is_resource_modified
+from hypercorn.middleware import AsyncioWSGIMiddleware
+
+import app as flask_module
+from app import (
+    stock_service, prediction_service, live_hub, RateLimitException, PERIODS, PREDICTION_MODES,
+    MAX_MONTE_CARLO_PATHS, MAX_BATCH_SYMBOLS, HISTORY_FORMATS, COMPRESSION, COMPRESS_MIN_BYTES,
+    SERVER_TIMING, REQUEST_SECONDS, REQUESTS_TOTAL, REQUESTS_IN_FLIGHT, brotli, _etag, _stock_json,
+    client_limiter, _client_over_limit
+)
+from services.backends import run_backend
+from services.http_client import close_async_clients
+from services.metrics import start_request_timing, request_timings, finish_request_timing, server_timing_header
+
+# ---------------- Async Serving Mode ----------------
+
+# ASGI entry point: hypercorn asgi_app:application
+#
+# The routes that wait on upstreams (stock data, batch, live quotes and
+# single or batch predictions) are served by async Quart handlers that
+# await Stooq and Hugging Face through httpx, so a slow upstream holds a
+# coroutine instead of a worker thread. Live-price streams are coroutines
+# too, so a worker can hold many more of them than under gunicorn. Every other route is passed through
+# to the Flask app unchanged, running on a thread pool of its own
+# (STOCK_WSGI_THREADS). Both halves share the services, caches and metrics
+# created in app.py.
+
+quart_app = Quart(__name__)
+
+
+def _error(message, details, status):
+    return jsonify({"error": message, "details": details}), status
+
+
+def _rate_limited(e):
+    return _error("Rate limit exceeded", str(e), 429) + ({"Retry-After": str(e.retry_seconds)},)
+
+
+def _upstream_error(e):
+    if isinstance(e, RateLimitException):
+        return _rate_limited(e)
+    if isinstance(e, ValueError):
+        return _error("Invalid symbol", str(e), 400)
+    return _error("External data provider unavailable", str(e), 503)
+
+# ---------------- Request Hooks ----------------
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+@quart_app.before_request
+async def _start_request_metrics():
+    g.request_start = time.perf_counter()
+    g.timing_token = start_request_timing()
+    REQUESTS_IN_FLIGHT.inc(route=_route())
+
+
+@quart_app.before_request
+async def _limit_client():
+    # Same per-client limit as the Flask routes (app._client_over_limit).
+    e = None
+    if client_limiter is not None:
+        e = await run_backend(client_limiter, _client_over_limit, request)
+    if e is not None:
+        return _rate_limited(e)
+
+
+@quart_app.after_request
+async def _finish_response(response):
+    elapsed = time.perf_counter() - g.request_start
+    route = _route()
+    REQUEST_SECONDS.observe(elapsed, route=route, method=request.method)
+    REQUESTS_TOTAL.inc(route=route, method=request.method, status=response.status_code)
+    if SERVER_TIMING:
+        response.headers['Server-Timing'] = server_timing_header(request_timings(), elapsed)
+    response.headers.setdefault('Access-Control-Allow-Origin', '*')
+
+    if (not COMPRESSION or response.status_code < 200 or response.status_code in (204, 304)
+            or isinstance(response.response, IterableBody)):
+        # Streamed bodies (live prices) are sent as they are produced.
+        return response
+    response.vary.add('Accept-Encoding')
+    body = await response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        response.set_data(brotli.compress(body, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif accepted['gzip']:
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+@quart_app.teardown_request
+async def _finish_request_metrics(error=None):
+    if 'timing_token' in g:
+        REQUESTS_IN_FLIGHT.dec(route=_route())
+        finish_request_timing(g.pop('timing_token'))
+
+
+@quart_app.after_serving
+async def _close_clients():
+    await close_async_clients()
+
+# ---------------- HTTP Caching ----------------
+
+def _modified(etag, last_modified=None):
+    return is_resource_modified(
+        http_range=None,
+        http_if_range=None,
+        http_if_modified_since=request.headers.get('If-Modified-Since'),
+        http_if_none_match=request.headers.get('If-None-Match'),
+        http_if_match=None,
+        etag=etag,
+        last_modified=last_modified,
+    )
+
+
+def _not_modified(etag, last_modified=None):
+    response = Response(b"", status=304)
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+async def _conditional_json(build, etag=None, last_modified=None):
+    # Same semantics as app._conditional_json.
+    if etag is not None and not _modified(etag, last_modified):
+        return _not_modified(etag, last_modified)
+
+    response = jsonify(build())
+    if etag is None:
+        etag = hashlib.sha1(await response.get_data()).hexdigest()[:20]
+        if not _modified(etag):
+            return _not_modified(etag)
+
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _history_format():
+    history_format = request.args.get('format', 'records')
+    return history_format if history_format in HISTORY_FORMATS else None
+
+# ---------------- Async Routes ----------------
+
+@quart_app.route('/api/stock/<symbol>', methods=['GET'])
+async def get_stock_data(symbol):
+    period = request.args.get('period', '1mo')
+    if period not in PERIODS:
+        return _error(f"Unsupported period '{period}'", f"Supported periods: {', '.join(PERIODS)}", 400)
+    history_format = _history_format()
+    if history_format is None:
+        return _error(
+            f"Unsupported format '{request.args.get('format')}'",
+            f"Supported formats: {', '.join(HISTORY_FORMATS)}", 400
+        )
+
+    try:
+        data = await stock_service.get_stock_data_async(symbol, period)
+    except Exception as e:
+        return _upstream_error(e)
+    age = await stock_service.bars_age_async(symbol)
+    fetched_at = datetime.fromtimestamp(time.time() - age, timezone.utc) if age is not None else None
+    etag = _etag(symbol, period, history_format, data["history"].fingerprint())
+    return await _conditional_json(lambda: _stock_json(data, history_format), etag, fetched_at)
+
+
+@quart_app.route('/api/stocks', methods=['GET'])
+async def get_stocks_batch():
+    symbols = [s.strip() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    symbols = list(dict.fromkeys(symbols))
+    period = request.args.get('period', '1mo')
+    if not symbols:
+        return jsonify({"error": "Query parameter 'symbols' is required"}), 400
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        return _error("Too many symbols", f"At most {MAX_BATCH_SYMBOLS} symbols per request", 400)
+    if period not in PERIODS:
+        return _error(f"Unsupported period '{period}'", f"Supported periods: {', '.join(PERIODS)}", 400)
+    history_format = _history_format()
+    if history_format is None:
+        return _error(
+            f"Unsupported format '{request.args.get('format')}'",
+            f"Supported formats: {', '.join(HISTORY_FORMATS)}", 400
+        )
+
+    results, errors = await stock_service.get_many_async(symbols, period)
+    etag = _etag(
+        period, history_format,
+        *(f"{symbol}={data['history'].fingerprint()}" for symbol, data in sorted(results.items())),
+        json.dumps(errors, sort_keys=True)
+    )
+    return await _conditional_json(lambda: {
+        "results": {symbol: _stock_json(data, history_format) for symbol, data in results.items()},
+        "errors": errors
+    }, etag)
+
+
+@quart_app.route('/api/stock/<symbol>/live', methods=['GET'])
+async def get_live_price(symbol):
+    try:
+        return jsonify(await stock_service.get_live_price_async(symbol))
+    except Exception as e:
+        return _upstream_error(e)
+
+
+class _StreamBody(IterableBody):
+    # Runs on_close once Quart is done with the body: sent, cut short by a
+    # disconnect, or never iterated (HEAD).
+    def __init__(self, iterable, on_close):
+        super().__init__(iterable)
+        self.on_close = on_close
+
+    async def __aexit__(self, exc_type, exc_value, tb):
+        try:
+            await super().__aexit__(exc_type, exc_value, tb)
+        finally:
+            self.on_close()
+
+
+@quart_app.route('/api/stock/<symbol>/stream', methods=['GET'])
+async def stream_live_price(symbol):
+    # Same events as app.stream_live_price, read from the hub on the event
+    # loop, so an open stream costs a coroutine rather than a thread.
+    subscription = live_hub.subscribe(symbol, asyncio.get_running_loop())
+    if subscription is None:
+        return _error("Too many open streams", f"Poll /api/stock/{symbol}/live instead", 503) + (
+            {"Retry-After": str(int(live_hub.interval))},
+        )
+
+    async def events():
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event, data = await subscription.get(timeout=15)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    response = Response(_StreamBody(events(), lambda: live_hub.unsubscribe(symbol, subscription)), headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    }, mimetype='text/event-stream')
+    # No RESPONSE_TIMEOUT: the stream stays open until the client leaves.
+    response.timeout = None
+    return response
+
+
+@quart_app.route('/api/stock/<symbol>/predict', methods=['GET'])
+async def predict_stock(symbol):
+    days = request.args.get('days', 7, type=int)
+    mode = request.args.get('mode', 'walk')
+    paths = request.args.get('paths', 10000, type=int)
+    seed = request.args.get('seed', 0, type=int)
+    if mode not in PREDICTION_MODES:
+        return _error(f"Unsupported mode '{mode}'", f"Supported modes: {', '.join(PREDICTION_MODES)}", 400)
+    if mode == 'montecarlo' and not (1 <= paths <= MAX_MONTE_CARLO_PATHS and 1 <= days <= 90):
+        return _error(
+            "Invalid Monte Carlo parameters", f"paths must be 1-{MAX_MONTE_CARLO_PATHS} and days 1-90", 400
+        )
+
+    try:
+        stock_data = await stock_service.get_stock_data_async(symbol, '3mo')
+        state = await asyncio.to_thread(stock_service.get_indicator_state, symbol)
+        prediction = await prediction_service.predict_async(
+            symbol, stock_data, days, state.latest(), mode=mode, paths=paths, seed=seed
+        )
+    except Exception as e:
+        return _upstream_error(e)
+    return await _conditional_json(lambda: prediction)
+
+@quart_app.route('/api/predictions', methods=['GET'])
+async def predict_stocks_batch():
+    symbols = [s.strip() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    symbols = list(dict.fromkeys(symbols))
+    days = request.args.get('days', 7, type=int)
+    mode = request.args.get('mode', 'walk')
+    paths = request.args.get('paths', 10000, type=int)
+    seed = request.args.get('seed', 0, type=int)
+    if not symbols:
+        return jsonify({"error": "Query parameter 'symbols' is required"}), 400
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        return _error("Too many symbols", f"At most {MAX_BATCH_SYMBOLS} symbols per request", 400)
+    if mode not in PREDICTION_MODES:
+        return _error(f"Unsupported mode '{mode}'", f"Supported modes: {', '.join(PREDICTION_MODES)}", 400)
+    if mode == 'montecarlo' and not (1 <= paths <= MAX_MONTE_CARLO_PATHS and 1 <= days <= 90):
+        return _error(
+            "Invalid Monte Carlo parameters", f"paths must be 1-{MAX_MONTE_CARLO_PATHS} and days 1-90", 400
+        )
+
+    stocks, errors = await stock_service.get_many_async(symbols, '3mo')
+    indicators = await asyncio.to_thread(
+        lambda: {symbol: stock_service.get_indicator_state(symbol).latest() for symbol in stocks}
+    )
+    results, prediction_errors = await prediction_service.predict_many_async(
+        stocks, days, indicators, mode=mode, paths=paths, seed=seed
+    )
+    errors.update(prediction_errors)
+    return await _conditional_json(lambda: {"results": results, "errors": errors})
+
+# ---------------- Dispatcher ----------------
+
+# Flask's URL map decides which view a request belongs to (so e.g.
+# /api/stock/search stays with Flask); views listed here go to Quart.
+ASYNC_ENDPOINTS = {
+    "get_stock_data", "get_stocks_batch", "get_live_price", "stream_live_price", "predict_stock",
+    "predict_stocks_batch"
+}
+
+# Flask views run on their own bounded pool rather than the loop's default
+# executor (min(32, cpus + 4) threads), so slow passthrough routes cannot
+# starve the asyncio.to_thread calls made by the async routes.
+WSGI_THREADS = int(os.environ.get('STOCK_WSGI_THREADS', 16))
+
+
+class _WSGIBridge(AsyncioWSGIMiddleware):
+    def __init__(self, wsgi_app, threads):
+        super().__init__(wsgi_app)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+
+        def call_soon(func, *args):
+            return asyncio.run_coroutine_threadsafe(func(*args), loop).result()
+
+        await self.wsgi_app(scope, receive, send, partial(loop.run_in_executor, self.executor), call_soon)
+
+
+flask_asgi = _WSGIBridge(flask_module.app, WSGI_THREADS)
+_flask_routes = flask_module.app.url_map.bind("")
+
+
+def _handled_by_quart(scope):
+    try:
+        endpoint, _ = _flask_routes.match(scope["path"], method=scope["method"])
+    except HTTPException:
+        return False
+    return endpoint in ASYNC_ENDPOINTS
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan" or (scope["type"] == "http" and _handled_by_quart(scope)):
+        await quart_app(scope, receive, send)
+    else:
+        await flask_asgi(scope, receive, send)
+
+
+if __name__ == '__main__':
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [f"0.0.0.0:{int(os.environ.get('PORT', 10000))}"]
+    asyncio.run(serve(application, config))
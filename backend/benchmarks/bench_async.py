@@ -0,0 +1,129 @@
+# Concurrency scaling with slow upstreams: the same API served by
+#   - gunicorn with 2 sync workers (the original deployment),
+#   - gunicorn with 2 gthread workers x 16 threads (render.yaml),
+#   - hypercorn running asgi_app:application (async mode, 2 workers),
+# while every request misses the cache and waits --latency seconds on the
+# local Stooq stand-in. Completed requests per second should track
+# concurrency / latency until a server runs out of workers or threads.
+#
+#   cd backend && python benchmarks/bench_async.py --latency 0.5 --concurrency 8,32,128 --output async.json
+
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from fake_upstreams import FakeStooq
+from benchlib import summarize, write_results
+
+SERVERS = {
+    "gunicorn-sync": ["-m", "gunicorn", "--workers", "2", "--timeout", "120", "app:app"],
+    "gunicorn-gthread": ["-m", "gunicorn", "--workers", "2", "--worker-class", "gthread",
+                         "--threads", "16", "--timeout", "120", "app:app"],
+    "hypercorn-asgi": ["-m", "hypercorn", "--workers", "2", "asgi_app:application"],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(name, env):
+    port = free_port()
+    args = SERVERS[name] + ["--bind", f"127.0.0.1:{port}"]
+    process = subprocess.Popen(
+        [sys.executable] + args, cwd=BACKEND, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            requests.get(f"{base_url}/api/health", timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{name} did not start")
+
+
+def run_level(base_url, concurrency, total, prefix):
+    def one(i):
+        # A fresh symbol per request, so every request goes upstream.
+        start = time.perf_counter()
+        try:
+            status = requests.get(f"{base_url}/api/stock/{prefix}{i}", timeout=120).status_code
+        except requests.RequestException:
+            status = "error"
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+
+    result = summarize([latency for latency, _ in samples], elapsed)
+    result["statusCounts"] = {}
+    for _, status in samples:
+        result["statusCounts"][str(status)] = result["statusCounts"].get(str(status), 0) + 1
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per Stooq request")
+    parser.add_argument("--concurrency", default="8,32,128")
+    parser.add_argument("--rounds", type=int, default=2, help="requests per client per level")
+    parser.add_argument("--servers", default=",".join(SERVERS))
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    stooq = FakeStooq(bars=300, latency=args.latency).start()
+
+    results = {}
+    print(f"Stooq latency {args.latency}s, unique symbol per request")
+    print(f"{'server':<18} {'clients':>8} {'rps':>8} {'p50 ms':>9} {'p99 ms':>9}  statuses")
+    for name in args.servers.split(","):
+        env = dict(
+            os.environ,
+            STOOQ_BASE_URL=stooq.url,
+            STOCK_HISTORY_DIR=tempfile.mkdtemp(prefix=f"bench-{name}-"),
+            STOCK_PREFETCH="0",
+            STOCK_CLIENT_RATE_LIMIT="0",
+            STOCK_UPSTREAM_RATE_LIMITS="",
+            PYTHONWARNINGS="ignore",
+        )
+        process, base_url = start_server(name, env)
+        try:
+            results[name] = {}
+            for concurrency in levels:
+                result = run_level(base_url, concurrency, concurrency * args.rounds, f"S{concurrency}X")
+                results[name][str(concurrency)] = result
+                print(f"{name:<18} {concurrency:>8} {result['throughputRps']:>8.1f} "
+                      f"{result['p50Ms']:>9.0f} {result['p99Ms']:>9.0f}  {result['statusCounts']}")
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    stooq.stop()
+    if args.output:
+        config = {key: value for key, value in vars(args).items() if key != "output"}
+        write_results(args.output, "async", config, results)
+
+
+if __name__ == "__main__":
+    main()
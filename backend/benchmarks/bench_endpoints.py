@@ -0,0 +1,155 @@
+# Load test for the HTTP API: the real Flask app is served in-process and
+# pointed at local Stooq and Hugging Face stand-ins with configurable
+# latency and failure injection. Each endpoint is hit by --concurrency
+# clients for --requests requests; throughput, p50/p99 latency and status
+# codes are reported per endpoint and optionally written as JSON.
+#
+#   cd backend && python benchmarks/bench_endpoints.py --concurrency 16 --requests 400 \
+#       --stooq-latency 0.05 --stooq-failure-rate 0.02 --output results.json
+#
+# Gemini is not faked: without GEMINI_API_KEY /analyze serves the rule-based
+# analysis, which is what this measures.
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_upstreams import FakeStooq, FakeHuggingFace
+from benchlib import summarize, write_results
+
+SYMBOLS = ("AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "RELIANCE.NS", "TCS.NS", "HDFCBANK.NS")
+
+# name -> path template; {symbol} cycles through the symbol set.
+ENDPOINTS = {
+    "health": "/api/health",
+    "search": "/api/stock/search?q=ba",
+    "stock_1mo": "/api/stock/{symbol}",
+    "stock_1y": "/api/stock/{symbol}?period=1y",
+    "stock_1y_columnar": "/api/stock/{symbol}?period=1y&format=columnar",
+    "stocks_batch": "/api/stocks?symbols=AAPL,MSFT,GOOGL,AMZN",
+    "indicators": "/api/stock/{symbol}/indicators",
+    "predict": "/api/stock/{symbol}/predict",
+    "predict_montecarlo": "/api/stock/{symbol}/predict?mode=montecarlo&paths=10000",
+    "predict_batch": "/api/predictions?symbols=AAPL,MSFT,GOOGL,AMZN",
+    "analyze": "/api/stock/{symbol}/analyze",
+    "screener": "/api/screener",
+}
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def run_endpoint(base_url, template, symbols, concurrency, total):
+    local = threading.local()
+
+    def one(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        url = base_url + template.format(symbol=symbols[i % len(symbols)])
+        start = time.perf_counter()
+        try:
+            status = session.get(url, timeout=30).status_code
+        except requests.RequestException:
+            status = "error"
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    result = summarize([latency for latency, _ in samples], elapsed)
+    result["statusCounts"] = statuses
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--symbols", type=int, default=4)
+    parser.add_argument("--bars", type=int, default=2500, help="daily bars per fake symbol")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma-separated subset")
+    parser.add_argument("--stooq-latency", type=float, default=0.0)
+    parser.add_argument("--stooq-failure-rate", type=float, default=0.0)
+    parser.add_argument("--stooq-failure-status", type=int, default=503)
+    parser.add_argument("--hf-latency", type=float, default=0.0)
+    parser.add_argument("--hf-failure-rate", type=float, default=0.0)
+    parser.add_argument("--hf-failure-status", type=int, default=503)
+    parser.add_argument("--no-warmup", action="store_true", help="measure cold caches too")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    names = [name for name in args.endpoints.split(",") if name]
+    unknown = set(names) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    stooq = FakeStooq(
+        bars=args.bars, latency=args.stooq_latency,
+        failure_rate=args.stooq_failure_rate, failure_status=args.stooq_failure_status
+    ).start()
+    hf = FakeHuggingFace(
+        latency=args.hf_latency, failure_rate=args.hf_failure_rate, failure_status=args.hf_failure_status
+    ).start()
+    os.environ.update({
+        "STOOQ_BASE_URL": stooq.url,
+        "HUGGINGFACE_API_URL": f"{hf.url}/models/facebook/bart-large-mnli",
+        "HUGGINGFACE_API_KEY": "bench",
+        "STOCK_HISTORY_DIR": tempfile.mkdtemp(prefix="bench-endpoints-"),
+        "STOCK_PREFETCH": "0",
+        # The load generator is one client hammering one upstream.
+        "STOCK_CLIENT_RATE_LIMIT": "0",
+        "STOCK_UPSTREAM_RATE_LIMITS": "",
+    })
+    os.environ.pop("GEMINI_API_KEY", None)
+
+    from app import app
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    symbols = SYMBOLS[:args.symbols]
+
+    if not args.no_warmup:
+        with requests.Session() as session:
+            for symbol in symbols:
+                session.get(f"{base_url}/api/stock/{symbol}", timeout=30)
+
+    results = {}
+    print(f"{'endpoint':<20} {'rps':>8} {'p50 ms':>9} {'p99 ms':>9}  statuses")
+    for name in names:
+        stooq_before, hf_before = stooq.requests, hf.requests
+        result = run_endpoint(base_url, ENDPOINTS[name], symbols, args.concurrency, args.requests)
+        result["upstreamRequests"] = {"stooq": stooq.requests - stooq_before, "huggingface": hf.requests - hf_before}
+        results[name] = result
+        print(f"{name:<20} {result['throughputRps']:>8.1f} {result['p50Ms']:>9.2f} {result['p99Ms']:>9.2f}  "
+              f"{result['statusCounts']}")
+
+    print(f"upstream requests: stooq {stooq.requests} ({stooq.failures} injected failures), "
+          f"huggingface {hf.requests} ({hf.failures} injected failures)")
+
+    if args.output:
+        config = {key: value for key, value in vars(args).items() if key != "output"}
+        write_results(args.output, "endpoints", config, results)
+
+    server.shutdown()
+    stooq.stop()
+    hf.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Compares the old row-by-row history path (iterrows serialization, list
+# comprehensions in the services) with the columnar Bars path.
+#
+#   cd backend && python benchmarks/bench_history.py
+
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.bars import Bars
+from services.history_store import BAR_DTYPE
+
+SIZES = (30, 250, 5000)
+
+
+def make_frame(n):
+    rng = np.random.default_rng(0)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.01, n))
+    return pd.DataFrame({
+        "Date": pd.bdate_range("2000-01-03", periods=n).strftime("%Y-%m-%d"),
+        "Open": close * 0.995,
+        "High": close * 1.01,
+        "Low": close * 0.99,
+        "Close": close,
+        "Volume": rng.integers(1_000, 1_000_000, n),
+    })
+
+
+def make_bars(df):
+    arr = np.empty(len(df), dtype=BAR_DTYPE)
+    arr["date"] = pd.to_datetime(df["Date"]).to_numpy().astype("datetime64[D]")
+    for col in ("open", "high", "low", "close", "volume"):
+        arr[col] = df[col.capitalize()]
+    return Bars.from_structured(arr)
+
+
+def old_path(df):
+    history = []
+    for _, row in df.iterrows():
+        history.append({
+            "date": row["Date"],
+            "open": round(float(row["Open"]), 2),
+            "high": round(float(row["High"]), 2),
+            "low": round(float(row["Low"]), 2),
+            "close": round(float(row["Close"]), 2),
+            "volume": int(row["Volume"]) if not pd.isna(row["Volume"]) else 0
+        })
+
+    closes = [h['close'] for h in history]
+    volumes = [h['volume'] for h in history]
+    avg_volume = sum(volumes) / len(volumes)
+    daily_returns = [(closes[i] - closes[i-1]) / closes[i-1] * 100 for i in range(1, len(closes))]
+    avg_return = sum(daily_returns) / len(daily_returns)
+    variance = sum((r - avg_return) ** 2 for r in daily_returns) / len(daily_returns)
+    prices = np.array([item['close'] for item in history])
+    return history, avg_volume, variance, prices[-1]
+
+
+def new_path(bars):
+    closes = bars.close
+    avg_volume = bars.volume.mean()
+    daily_returns = np.diff(closes) / closes[:-1] * 100
+    variance = daily_returns.var()
+    return bars.to_records(), avg_volume, variance, closes[-1]
+
+
+def main():
+    print(f"{'bars':>6} {'iterrows (ms)':>14} {'columnar (ms)':>14} {'speedup':>8}")
+    for n in SIZES:
+        df = make_frame(n)
+        bars = make_bars(df)
+        number = max(1, 2000 // n)
+        old = min(timeit.repeat(lambda: old_path(df), number=number, repeat=5)) / number
+        new = min(timeit.repeat(lambda: new_path(bars), number=number, repeat=5)) / number
+        print(f"{n:>6} {old * 1e3:>14.3f} {new * 1e3:>14.3f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Checks that IndicatorState, fed one bar at a time, matches a full
+# recomputation with compute_indicators()/return_stats()/latest_indicators()
+# at every checkpoint, then times an O(1) update against a full recompute.
+# Exits non-zero on any mismatch.
+#
+#   cd backend && python benchmarks/bench_indicator_state.py
+
+import os
+import sys
+import math
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.bars import Bars
+from services.indicators import IndicatorState, compute_indicators, return_stats, latest_indicators
+
+RTOL = 1e-9
+
+
+def make_bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.02, n))
+    dates = pd.bdate_range("2000-01-03", periods=n).to_numpy().astype("datetime64[D]")
+    high = close * (1 + rng.uniform(0, 0.02, n))
+    low = close * (1 - rng.uniform(0, 0.02, n))
+    return Bars(dates, close, high, low, close, rng.integers(1, 10**6, n))
+
+
+def close_enough(a, b):
+    if isinstance(a, float) and math.isnan(a):
+        return isinstance(b, float) and math.isnan(b)
+    return abs(a - b) <= RTOL * max(1.0, abs(a), abs(b))
+
+
+def check(state, bars):
+    expected = {name: float(series[-1]) for name, series in compute_indicators(bars).items()}
+    if len(bars) > 1:
+        stats = return_stats(bars.close)
+        expected["averageDailyReturn"] = float(stats["averageDailyReturn"])
+        expected["returnVolatility"] = float(stats["volatility"])
+        expected["winRate"] = float(stats["winRate"])
+
+    mismatches = []
+    snapshot = state.snapshot()
+    for name, value in expected.items():
+        if not close_enough(snapshot[name], value):
+            mismatches.append(f"{name}: incremental={snapshot[name]!r} full={value!r}")
+    if state.latest() != latest_indicators(bars.close):
+        mismatches.append(f"latest: incremental={state.latest()} full={latest_indicators(bars.close)}")
+    return mismatches
+
+
+def main():
+    n = 3000
+    bars = make_bars(n)
+    checkpoints = set(range(1, 40)) | set(range(40, n, 97)) | {n}
+
+    state = IndicatorState()
+    failures = 0
+    for i in range(n):
+        state.update(bars.date[i], float(bars.high[i]), float(bars.low[i]), float(bars.close[i]))
+        if i + 1 in checkpoints:
+            for problem in check(state, bars[:i + 1]):
+                failures += 1
+                print(f"  bar {i + 1}: {problem}")
+
+    print(f"equivalence: {len(checkpoints)} checkpoints over {n} bars, {failures} mismatches")
+
+    reps = 2000
+    start = time.perf_counter()
+    probe = IndicatorState()
+    probe.update_bars(bars[:n - reps])
+    warm = time.perf_counter()
+    probe.update_bars(bars[n - reps:])
+    per_update = (time.perf_counter() - warm) / reps
+
+    start = time.perf_counter()
+    for _ in range(20):
+        compute_indicators(bars)
+    per_full = (time.perf_counter() - start) / 20
+
+    print(f"incremental update: {per_update * 1e6:.1f} us/bar   "
+          f"full recompute of {n} bars: {per_full * 1e3:.2f} ms")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
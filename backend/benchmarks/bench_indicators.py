@@ -0,0 +1,90 @@
+# Compares the previous per-call indicator code (one snapshot per call, so a
+# full series needs one call per bar) and the pure-Python analysis metrics
+# with the vectorized engine in services/indicators.py.
+#
+#   cd backend && python benchmarks/bench_indicators.py
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import indicators
+from services.bars import Bars
+
+SIZES = (250, 1000, 5000)
+
+
+def old_snapshot(prices):
+    prices = np.array(prices)
+
+    sma_5 = np.mean(prices[-5:]) if len(prices) >= 5 else np.mean(prices)
+    sma_20 = np.mean(prices[-20:]) if len(prices) >= 20 else np.mean(prices)
+
+    if len(prices) >= 14:
+        deltas = np.diff(prices[-15:])
+        gains = np.where(deltas > 0, deltas, 0)
+        losses = np.where(deltas < 0, -deltas, 0)
+        avg_gain = np.mean(gains)
+        avg_loss = np.mean(losses)
+        rs = avg_gain / avg_loss if avg_loss > 0 else 100
+        rsi = 100 - (100 / (1 + rs))
+    else:
+        rsi = 50
+
+    if len(prices) >= 2:
+        volatility = np.std(prices[-20:]) / np.mean(prices[-20:]) * 100 if len(prices) >= 20 else np.std(prices) / np.mean(prices) * 100
+    else:
+        volatility = 0
+
+    momentum = ((prices[-1] - prices[-5]) / prices[-5] * 100) if len(prices) >= 5 else 0
+    return sma_5, sma_20, rsi, volatility, momentum
+
+
+def old_metrics(closes):
+    daily_returns = []
+    for i in range(1, len(closes)):
+        daily_returns.append((closes[i] - closes[i-1]) / closes[i-1] * 100)
+    avg_return = sum(daily_returns) / len(daily_returns)
+    variance = sum((r - avg_return) ** 2 for r in daily_returns) / len(daily_returns)
+    positive_days = sum(1 for r in daily_returns if r > 0)
+    return avg_return, variance ** 0.5, positive_days / len(daily_returns) * 100
+
+
+def make_bars(n):
+    rng = np.random.default_rng(0)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.015, n))
+    dates = pd.bdate_range("2000-01-03", periods=n).to_numpy().astype("datetime64[D]")
+    return Bars(dates, close * 0.996, close * 1.01, close * 0.99, close, rng.integers(1, 10**6, n))
+
+
+def best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'bars':>6} {'series: per-call (ms)':>22} {'vectorized (ms)':>16} {'speedup':>8}"
+          f" {'metrics: loops (ms)':>20} {'vectorized (ms)':>16} {'speedup':>8}")
+    for n in SIZES:
+        bars = make_bars(n)
+        closes = bars.close.tolist()
+
+        old_series = best_of(lambda: [old_snapshot(bars.close[:i + 1]) for i in range(n)])
+        new_series = best_of(lambda: indicators.compute_indicators(bars))
+        old_stats = best_of(lambda: old_metrics(closes))
+        new_stats = best_of(lambda: indicators.return_stats(bars.close))
+
+        print(f"{n:>6} {old_series * 1e3:>22.2f} {new_series * 1e3:>16.3f} {old_series / new_series:>7.0f}x"
+              f" {old_stats * 1e3:>20.3f} {new_stats * 1e3:>16.3f} {old_stats / new_stats:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
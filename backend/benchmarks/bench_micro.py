@@ -0,0 +1,64 @@
+# Microbenchmarks for the hot in-process stages: Stooq CSV parsing, history
+# serialization (records, columnar, JSON encoding) and indicator math, for
+# a few history lengths. Results can be written as JSON for compare.py.
+#
+#   cd backend && python benchmarks/bench_micro.py --output micro.json
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_upstreams import FakeStooq
+from benchlib import time_call, write_results
+from services import indicators
+from services.bars import Bars
+from services.stock_service import StockService
+
+SIZES = (250, 1250, 5000)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    parse = StockService._parse_stooq_csv.__get__(object.__new__(StockService))
+    results = {}
+    print(f"{'stage':<24} " + " ".join(f"{n:>10}" for n in map(int, args.sizes.split(","))) + "   (us per call)")
+    rows = {}
+    for n in map(int, args.sizes.split(",")):
+        csv_text = FakeStooq(bars=n)._frame("BENCH").to_csv(index=False)
+        bars = Bars.from_structured(parse(csv_text))
+        records = bars.to_records()
+        columns = bars.to_columns()
+
+        stages = {
+            "csv_parse": lambda: parse(csv_text),
+            "to_records": bars.to_records,
+            "to_columns": bars.to_columns,
+            "json_records": lambda: json.dumps(records),
+            "json_columns": lambda: json.dumps(columns),
+            "compute_indicators": lambda: indicators.compute_indicators(bars),
+            "latest_indicators": lambda: indicators.latest_indicators(bars.close),
+            "return_stats": lambda: indicators.return_stats(bars.close),
+        }
+        results[str(n)] = {}
+        for name, fn in stages.items():
+            seconds = time_call(fn, repeat=args.repeat)
+            results[str(n)][name] = {"us": round(seconds * 1e6, 2)}
+            rows.setdefault(name, []).append(seconds * 1e6)
+
+    for name, values in rows.items():
+        print(f"{name:<24} " + " ".join(f"{v:>10.1f}" for v in values))
+
+    if args.output:
+        write_results(args.output, "micro", {"sizes": args.sizes, "repeat": args.repeat}, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Symbol search over a synthetic instrument master the size of a full
+# NSE/BSE/US listing: the previous linear substring scan versus the
+# prefix/trigram InstrumentIndex, per keystroke-style query.
+#
+#   cd backend && python benchmarks/bench_search.py
+
+import os
+import sys
+import time
+import random
+import string
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.instruments import InstrumentIndex, load_instruments
+
+SIZE = 60000
+QUERIES = ["a", "re", "tcs", "reli", "reliance", "tata mot", "micrsoft", "bank", "hdfc bank", "zzzz"]
+ROUNDS = 50
+WORDS = ["Industries", "Bank", "Holdings", "Technologies", "Pharma", "Energy", "Motors",
+         "Finance", "Capital", "Systems", "Steel", "Power", "Global", "India", "Corporation"]
+
+
+def synthetic_instruments(n, seed=0):
+    rng = random.Random(seed)
+    suffixes = {"NSE": ".NS", "BSE": ".BO", "NYSE": "", "NASDAQ": ""}
+    items = load_instruments()
+    for i in range(n):
+        exchange = rng.choice(list(suffixes))
+        root = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(2, 9)))
+        name = " ".join([root.capitalize()] + rng.sample(WORDS, rng.randint(1, 2)))
+        items.append({"symbol": f"{root}{i % 97}{suffixes[exchange]}", "name": name, "exchange": exchange})
+    return items
+
+
+def linear_search(instruments, query):
+    query = query.upper()
+    return [
+        s for s in instruments
+        if query in s["symbol"].upper() or query in s["name"].upper()
+    ][:10]
+
+
+def per_query_us(fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for q in QUERIES:
+            fn(q)
+    return (time.perf_counter() - start) / (ROUNDS * len(QUERIES)) * 1e6
+
+
+def main():
+    instruments = synthetic_instruments(SIZE)
+
+    start = time.perf_counter()
+    index = InstrumentIndex(instruments)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{len(index)} instruments, index built in {build_ms:.0f} ms")
+    print(f"{'query':<12} {'linear us':>10} {'index us':>10}  top results")
+    for q in QUERIES:
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            linear_search(instruments, q)
+        linear = (time.perf_counter() - start) / ROUNDS * 1e6
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            results = index.search(q)
+        indexed = (time.perf_counter() - start) / ROUNDS * 1e6
+        print(f"{q:<12} {linear:>10.0f} {indexed:>10.0f}  {', '.join(r['symbol'] for r in results[:3])}")
+
+    print(f"mean per query: linear {per_query_us(lambda q: linear_search(instruments, q)):.0f} us, "
+          f"index {per_query_us(index.search):.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Runs several worker processes against one shared SQLite cache and counts
+# how many upstream fetches each symbol costs. With the shared backend every
+# key should be fetched once per TTL no matter how many workers ask for it;
+# the script exits non-zero if that does not hold.
+#
+#   cd backend && python benchmarks/bench_shared_cache.py --workers 4
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SYMBOLS = ("AAPL", "MSFT", "TCS.NS")
+
+
+def fake_bars(n=250):
+    from services.history_store import BAR_DTYPE
+    arr = np.zeros(n, dtype=BAR_DTYPE)
+    arr["date"] = pd.bdate_range("2023-01-02", periods=n).to_numpy().astype("datetime64[D]")
+    arr["close"] = np.linspace(100, 120, n)
+    return arr
+
+
+def worker(fetches, lock, start, requests_per_symbol, latency):
+    from services.stock_service import StockService
+
+    class CountingStockService(StockService):
+        def _download_stooq_bars(self, symbol, since=None):
+            with lock:
+                fetches[symbol] = fetches.get(symbol, 0) + 1
+            time.sleep(latency)
+            return fake_bars()
+
+    service = CountingStockService()
+    start.wait()
+    for _ in range(requests_per_symbol):
+        for symbol in SYMBOLS:
+            service.get_stock_data(symbol, "1mo")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="shared-cache-")
+    os.environ["STOCK_CACHE_BACKEND"] = "sqlite"
+    os.environ["STOCK_CACHE_PATH"] = os.path.join(tmp, "cache.sqlite3")
+    os.environ["STOCK_HISTORY_DIR"] = os.path.join(tmp, "history")
+
+    with mp.Manager() as manager:
+        fetches = manager.dict()
+        lock = manager.Lock()
+        start = manager.Event()
+        procs = [
+            mp.Process(target=worker, args=(fetches, lock, start, args.requests, args.latency))
+            for _ in range(args.workers)
+        ]
+        for p in procs:
+            p.start()
+
+        t0 = time.perf_counter()
+        start.set()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - t0
+        counts = dict(fetches)
+
+    total = args.workers * args.requests * len(SYMBOLS)
+    print(f"{args.workers} workers, {total} requests in {elapsed:.2f}s")
+    for symbol in SYMBOLS:
+        print(f"  {symbol:<8} upstream fetches: {counts.get(symbol, 0)}")
+
+    if any(p.exitcode for p in procs) or any(counts.get(s, 0) != 1 for s in SYMBOLS):
+        print("FAIL: expected exactly one upstream fetch per symbol")
+        sys.exit(1)
+    print("OK: one upstream fetch per symbol per TTL")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# Load test for /api/stock/<symbol>/stream: many simulated subscribers
+# spread over a few symbols, served by the real Flask app against a local
+# Stooq stand-in. Reports how many upstream requests the subscribers cost
+# and how many price events were delivered; per-subscriber figures count
+# accepted (200) streams only.
+#
+# --gunicorn serves the app with gunicorn.conf.py (gthread workers) instead
+# of werkzeug's unbounded threaded server, so STOCK_MAX_STREAMS applies:
+# streams beyond it are answered 503. --asgi serves asgi_app with hypercorn,
+# where streams are coroutines capped by STOCK_MAX_ASYNC_STREAMS. In both
+# modes a probe checks that /api/health stays responsive meanwhile.
+#
+#   cd backend && python benchmarks/bench_sse.py --subscribers 200 --symbols 4 --duration 10
+#   cd backend && python benchmarks/bench_sse.py --gunicorn --subscribers 40 --duration 10
+#   cd backend && python benchmarks/bench_sse.py --asgi --subscribers 200 --duration 10
+
+import os
+import sys
+import time
+import socket
+import subprocess
+import argparse
+import tempfile
+import threading
+import requests
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_upstreams import FakeStooq
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+SYMBOLS = ("AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "RELIANCE.NS", "TCS.NS", "HDFCBANK.NS")
+
+
+def subscriber(base_url, symbol, deadline, counts, lock):
+    events = 0
+    try:
+        with requests.get(f"{base_url}/api/stock/{symbol}/stream", stream=True, timeout=deadline - time.time() + 5) as r:
+            with lock:
+                counts.setdefault("status", {}).setdefault(r.status_code, 0)
+                counts["status"][r.status_code] += 1
+            if r.status_code != 200:
+                return
+            for line in r.iter_lines(decode_unicode=True):
+                if line == "event: price":
+                    events += 1
+                if time.time() >= deadline:
+                    break
+    except requests.RequestException:
+        pass
+    with lock:
+        counts[symbol] = counts.get(symbol, 0) + events
+
+
+def probe(base_url, deadline, latencies):
+    # Regular requests made while the streams are open.
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            requests.get(f"{base_url}/api/health", timeout=5)
+            latencies.append(time.perf_counter() - start)
+        except requests.RequestException:
+            latencies.append(None)
+        time.sleep(0.5)
+
+
+def start_server(asgi, env):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if asgi:
+        command = ["hypercorn", "--graceful-timeout", "1", "--bind", f"127.0.0.1:{port}", "asgi_app:application"]
+    else:
+        command = ["gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+    process = subprocess.Popen(
+        [sys.executable, "-m", *command],
+        cwd=backend, env=dict(env, PORT=str(port)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            requests.get(f"{base_url}/api/health", timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{command[0]} did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=200)
+    parser.add_argument("--symbols", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--interval", type=float, default=1)
+    parser.add_argument("--gunicorn", action="store_true", help="serve with gunicorn.conf.py")
+    parser.add_argument("--asgi", action="store_true", help="serve asgi_app with hypercorn")
+    args = parser.parse_args()
+
+    stooq = FakeStooq().start()
+    os.environ["STOOQ_BASE_URL"] = stooq.url
+    os.environ["STOCK_HISTORY_DIR"] = tempfile.mkdtemp(prefix="bench-sse-")
+    os.environ["STOCK_LIVE_INTERVAL"] = str(args.interval)
+    os.environ["STOCK_LIVE_TTL"] = str(int(args.interval))
+
+    external = args.gunicorn or args.asgi
+    if external:
+        env = dict(os.environ, STOCK_PREFETCH="0", STOCK_CLIENT_RATE_LIMIT="0", PYTHONWARNINGS="ignore")
+        server, base_url = start_server(args.asgi, env)
+    else:
+        from app import app
+        server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+    symbols = SYMBOLS[:args.symbols]
+    deadline = time.time() + args.duration
+    counts, lock = {}, threading.Lock()
+    threads = [
+        threading.Thread(target=subscriber, args=(base_url, symbols[i % len(symbols)], deadline, counts, lock))
+        for i in range(args.subscribers)
+    ]
+    latencies = []
+    threads.append(threading.Thread(target=probe, args=(base_url, deadline, latencies)))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    statuses = counts.pop("status", {})
+    accepted = statuses.get(200, 0)
+    delivered = sum(counts.values())
+    print(f"{args.subscribers} subscribers on {len(symbols)} symbols for {args.duration:.0f}s "
+          f"(poll interval {args.interval}s)")
+    print(f"  stream responses by status: {statuses}")
+    if accepted:
+        print(f"  upstream requests: {stooq.requests} "
+              f"({stooq.requests / len(symbols):.1f} per symbol, "
+              f"{stooq.requests / accepted:.2f} per accepted subscriber)")
+        print(f"  price events delivered: {delivered} ({delivered / accepted:.1f} per accepted subscriber)")
+    else:
+        print(f"  no stream was accepted; upstream requests: {stooq.requests}")
+    answered = sorted(latency for latency in latencies if latency is not None)
+    if answered:
+        print(f"  /api/health during the run: {len(answered)}/{len(latencies)} answered, "
+              f"max {answered[-1] * 1000:.0f} ms")
+    else:
+        print(f"  /api/health during the run: 0/{len(latencies)} answered")
+    print(f"  polling every {args.interval}s without the hub would cost "
+          f"~{int(accepted * args.duration / args.interval)} full CSV downloads")
+
+    if external:
+        server.terminate()
+        server.wait()
+    else:
+        server.shutdown()
+    stooq.stop()
+
+
+if __name__ == "__main__":
+    main()
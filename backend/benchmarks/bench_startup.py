@@ -0,0 +1,177 @@
+# Worker startup cost: how long `import app` takes and how much memory a
+# fresh process holds afterwards, then the resident (RSS) and proportional
+# (PSS, shared pages split between processes) memory of a gunicorn master
+# and its workers with and without STOCK_PRELOAD, before and after each
+# worker has served a request that parses Stooq CSV.
+#
+#   cd backend && python benchmarks/bench_startup.py --workers 2 --output startup.json
+#
+# Memory is read from /proc, so the gunicorn part needs Linux.
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import tempfile
+import requests
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from fake_upstreams import FakeStooq
+from benchlib import write_results
+
+HEAVY_MODULES = ("pandas", "google.generativeai", "grpc", "transformers", "torch", "sklearn", "yfinance")
+
+IMPORT_PROBE = f"""
+import sys, time, json
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as f:
+    rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+print(json.dumps({{
+    "importMs": elapsed * 1000,
+    "rssKiB": rss,
+    "heavyModules": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def _env(**extra):
+    return dict(
+        os.environ,
+        STOCK_HISTORY_DIR=tempfile.mkdtemp(prefix="bench-startup-"),
+        STOCK_PREFETCH="0",
+        STOCK_CLIENT_RATE_LIMIT="0",
+        PYTHONWARNINGS="ignore",
+        **extra
+    )
+
+
+def measure_import(runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND, env=_env(),
+            capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    return {
+        "importMs": round(statistics.median(s["importMs"] for s in samples), 1),
+        "rssMiB": round(statistics.median(s["rssKiB"] for s in samples) / 1024, 1),
+        "heavyModules": samples[-1]["heavyModules"],
+    }
+
+
+def _memory(pid):
+    with open(f"/proc/{pid}/status") as f:
+        rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        pss = next(int(line.split()[1]) for line in f if line.startswith("Pss:"))
+    return {"rssMiB": round(rss / 1024, 1), "pssMiB": round(pss / 1024, 1)}
+
+
+def _children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _snapshot(master, workers):
+    processes = {"master": _memory(master.pid)}
+    for i, pid in enumerate(sorted(_children(master.pid))):
+        processes[f"worker{i}"] = _memory(pid)
+    per_worker = [m for name, m in processes.items() if name != "master"]
+    return {
+        "processes": processes,
+        "workerRssMiB": round(statistics.mean(m["rssMiB"] for m in per_worker), 1) if per_worker else None,
+        "totalPssMiB": round(sum(m["pssMiB"] for m in processes.values()), 1),
+    }
+
+
+def measure_gunicorn(preload, workers, stooq_url, requests_after):
+    port = _free_port()
+    env = _env(
+        PORT=str(port), WEB_CONCURRENCY=str(workers), STOCK_PRELOAD="1" if preload else "0",
+        STOOQ_BASE_URL=stooq_url
+    )
+    start = time.perf_counter()
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                requests.get(f"{base_url}/api/health", timeout=1)
+                break
+            except requests.RequestException:
+                if time.time() > deadline:
+                    raise RuntimeError("gunicorn did not start")
+                time.sleep(0.05)
+        ready_ms = (time.perf_counter() - start) * 1000
+        # Give every worker time to finish booting before reading memory.
+        while len(_children(master.pid)) < workers and time.time() < deadline:
+            time.sleep(0.05)
+        time.sleep(1)
+        idle = _snapshot(master, workers)
+
+        # Fresh connections spread requests over the workers.
+        for i in range(requests_after):
+            requests.get(f"{base_url}/api/stock/BENCH{i}", timeout=30, headers={"Connection": "close"})
+        served = _snapshot(master, workers)
+        return {"readyMs": round(ready_ms, 1), "idle": idle, "afterRequests": served}
+    finally:
+        master.terminate()
+        try:
+            master.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            master.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters for the import measurement")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=20, help="stock requests before the second snapshot")
+    parser.add_argument("--no-gunicorn", action="store_true", help="only measure the import")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    results = {"import": measure_import(args.runs)}
+    imported = results["import"]
+    print(f"import app: {imported['importMs']:.0f} ms, {imported['rssMiB']:.1f} MiB RSS, "
+          f"heavy modules loaded: {', '.join(imported['heavyModules']) or 'none'}")
+
+    if not args.no_gunicorn:
+        stooq = FakeStooq(bars=2500).start()
+        print(f"{'gunicorn':<12} {'ready ms':>9} {'state':>8} {'worker RSS':>11} {'total PSS':>10}")
+        for preload in (False, True):
+            name = "preload" if preload else "no-preload"
+            result = measure_gunicorn(preload, args.workers, stooq.url, args.requests)
+            results[name] = result
+            for state, label in (("idle", "idle"), ("afterRequests", "served")):
+                snapshot = result[state]
+                print(f"{name:<12} {result['readyMs']:>9.0f} {label:>8} "
+                      f"{snapshot['workerRssMiB']:>8.1f} MiB {snapshot['totalPssMiB']:>6.1f} MiB")
+        stooq.stop()
+
+    if args.output:
+        config = {key: value for key, value in vars(args).items() if key != "output"}
+        write_results(args.output, "startup", config, results)
+
+
+if __name__ == "__main__":
+    main()
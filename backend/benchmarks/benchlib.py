@@ -0,0 +1,73 @@
+# Shared helpers for the benchmark scripts: latency summaries and
+# machine-readable result files that benchmarks/compare.py can diff.
+
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+import numpy as np
+
+
+def summarize(latencies, elapsed=None):
+    # Latencies in seconds -> milliseconds summary; throughput needs the
+    # wall-clock time the samples were collected over.
+    samples = np.sort(np.asarray(latencies, dtype=float)) * 1000
+    if not len(samples):
+        return {"count": 0}
+    summary = {
+        "count": int(len(samples)),
+        "meanMs": round(float(samples.mean()), 3),
+        "p50Ms": round(float(np.percentile(samples, 50)), 3),
+        "p90Ms": round(float(np.percentile(samples, 90)), 3),
+        "p99Ms": round(float(np.percentile(samples, 99)), 3),
+        "maxMs": round(float(samples[-1]), 3),
+    }
+    if elapsed:
+        summary["throughputRps"] = round(len(samples) / elapsed, 1)
+    return summary
+
+
+def time_call(fn, repeat=5, number=None):
+    # Best-of-repeat seconds per call; number is picked so one repeat takes
+    # roughly 0.2s when not given.
+    if number is None:
+        start = time.perf_counter()
+        fn()
+        once = time.perf_counter() - start
+        number = max(1, int(0.2 / once)) if once > 0 else 1000
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def write_results(path, benchmark, config, results):
+    payload = {
+        "benchmark": benchmark,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": config,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+    print(f"results written to {path}")
@@ -0,0 +1,48 @@
+# Diffs two JSON result files written by the benchmark scripts (same
+# benchmark, e.g. before and after a change) and prints the relative change
+# of every timing and throughput figure.
+#
+#   cd backend && python benchmarks/compare.py before.json after.json
+
+import sys
+import json
+
+# Lower is better for timings, higher is better for throughput.
+HIGHER_IS_BETTER = {"throughputRps"}
+METRICS = ("us", "meanMs", "p50Ms", "p90Ms", "p99Ms", "maxMs", "throughputRps")
+
+
+def _flatten(results, prefix=""):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        elif key in METRICS:
+            yield f"{prefix}{key}", value
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("usage: compare.py BEFORE.json AFTER.json")
+        sys.exit(2)
+    with open(sys.argv[1]) as f:
+        before = json.load(f)
+    with open(sys.argv[2]) as f:
+        after = json.load(f)
+    if before.get("benchmark") != after.get("benchmark"):
+        print(f"different benchmarks: {before.get('benchmark')} vs {after.get('benchmark')}")
+        sys.exit(2)
+
+    old = dict(_flatten(before["results"]))
+    new = dict(_flatten(after["results"]))
+    print(f"{before['benchmark']}: {before.get('commit')} -> {after.get('commit')}")
+    print(f"{'metric':<44} {'before':>12} {'after':>12} {'change':>9}")
+    for name in sorted(old.keys() & new.keys()):
+        a, b = old[name], new[name]
+        change = (b - a) / a * 100 if a else 0.0
+        better = change > 0 if name.rsplit(".", 1)[-1] in HIGHER_IS_BETTER else change < 0
+        flag = "" if abs(change) < 5 else (" better" if better else " worse")
+        print(f"{name:<44} {a:>12.2f} {b:>12.2f} {change:>+8.1f}%{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# Local stand-ins for upstream data providers, used by the load tests.
+#
+# FakeStooq serves /q/d/l/?s=<symbol>&i=d with a deterministic daily CSV per
+# symbol. Ranged requests (d1/d2) return only the latest bar, whose close
+# drifts on every request so live streams have something to push.
+#
+# FakeHuggingFace answers zero-shot classification requests with scores
+# derived from the input text.
+#
+# Every fake takes a latency (seconds per request) and can fail a share of
+# requests with failure_status (e.g. 503, or 429 to simulate throttling),
+# drawn from a seeded generator so runs are repeatable.
+
+import json
+import time
+import zlib
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeUpstream:
+    def __init__(self, latency=0.0, failure_rate=0.0, failure_status=503, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.requests = 0
+        self.failures = 0
+        self.paths = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def handle(self, handler):
+        raise NotImplementedError
+
+    def start(self, port=0):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self):
+                with upstream._lock:
+                    upstream.requests += 1
+                    path = urlparse(self.path).path
+                    upstream.paths[path] = upstream.paths.get(path, 0) + 1
+                    fail = upstream.failure_rate and upstream._rng.random() < upstream.failure_rate
+                    if fail:
+                        upstream.failures += 1
+                if upstream.latency:
+                    time.sleep(upstream.latency)
+                if fail:
+                    status, content_type, body = upstream.failure_status, "text/plain", b"Injected failure"
+                else:
+                    status, content_type, body = upstream.handle(self)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _dispatch
+            do_POST = _dispatch
+
+        self._server = _Server(("127.0.0.1", port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class FakeStooq(FakeUpstream):
+    def __init__(self, bars=2500, **kwargs):
+        super().__init__(**kwargs)
+        self.bars = bars
+        self._frames = {}
+        self._ticks = {}
+
+    def _frame(self, symbol):
+        if symbol not in self._frames:
+            rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+            close = 100 * np.cumprod(1 + rng.normal(0.0003, 0.015, self.bars))
+            self._frames[symbol] = pd.DataFrame({
+                "Date": pd.bdate_range(end="2024-06-03", periods=self.bars).strftime("%Y-%m-%d"),
+                "Open": (close * 0.996).round(4),
+                "High": (close * 1.012).round(4),
+                "Low": (close * 0.988).round(4),
+                "Close": close.round(4),
+                "Volume": rng.integers(100_000, 5_000_000, self.bars),
+            })
+        return self._frames[symbol]
+
+    def handle(self, handler):
+        query = parse_qs(urlparse(handler.path).query)
+        symbol = query.get("s", [""])[0]
+        if not symbol:
+            return 404, "text/plain", b"No data"
+
+        with self._lock:
+            df = self._frame(symbol)
+            if "d1" in query:
+                tick = self._ticks.get(symbol, 0) + 1
+                self._ticks[symbol] = tick
+                df = df.tail(1).copy()
+                df["Close"] = (df["Close"] * (1 + 0.001 * tick)).round(4)
+        return 200, "text/csv", df.to_csv(index=False).encode()
+
+
+class FakeHuggingFace(FakeUpstream):
+    def _classify(self, text, labels):
+        rng = np.random.default_rng(zlib.crc32(str(text).encode()))
+        scores = rng.dirichlet(np.ones(len(labels)))
+        order = np.argsort(scores)[::-1]
+        return {
+            "sequence": text,
+            "labels": [labels[i] for i in order],
+            "scores": [round(float(scores[i]), 6) for i in order],
+        }
+
+    def handle(self, handler):
+        length = int(handler.headers.get("Content-Length", 0))
+        payload = json.loads(handler.rfile.read(length) or b"{}")
+        inputs = payload.get("inputs", "")
+        labels = payload.get("parameters", {}).get("candidate_labels", ["bullish", "bearish", "neutral"])
+
+        # Like the hosted API, a list of inputs gets a list of results.
+        results = [self._classify(text, labels) for text in (inputs if isinstance(inputs, list) else [inputs])]
+        body = results if isinstance(inputs, list) else results[0]
+        return 200, "application/json", json.dumps(body).encode()
@@ -0,0 +1,20 @@
+import os
+
+# gunicorn -c gunicorn.conf.py app:app
+#
+# The production settings from render.yaml. STOCK_PRELOAD=1 imports the
+# app once in the master and forks the workers from it (see "Worker
+# Lifecycle" in app.py); background threads are then started per worker.
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = "gthread"
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+timeout = 120
+preload_app = os.environ.get('STOCK_PRELOAD', '0') == '1'
+
+
+def post_fork(server, worker):
+    if preload_app:
+        import app
+        app.start_background_work()
@@ -1,44 +1,73 @@
 import os
-import google.generativeai as genai
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from .backends import create_cache
+from .indicators import return_stats
+from .metrics import stage
+
+AI_RESULT_TTL = 24 * 60 * 60
+AI_FAILURE_TTL = 5 * 60
+AI_PENDING_TTL = 2 * 60
 
 class AnalysisService:
     def __init__(self):
-        api_key = os.environ.get('GEMINI_API_KEY', '')
-        if api_key:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-        else:
-            self.model = None
+        # google.generativeai (and the gRPC stack under it) is imported on
+        # the first AI call, so workers without a key never load it.
+        self.api_key = os.environ.get('GEMINI_API_KEY', '')
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.cache = create_cache("analysis", ttl=300)
+
+        # LLM calls run off the request path. Results are cached per
+        # (symbol, trading day) so each symbol costs one call per day. Job
+        # state is always kept in the shared SQLite file: a poll can land on
+        # any worker, and only one worker may submit a given job.
+        self.ai_cache = create_cache("ai", ttl=AI_RESULT_TTL, backend="sqlite")
+        self.ai_executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("GEMINI_WORKERS", 2)),
+            thread_name_prefix="gemini"
+        )
+        self._submit_lock = threading.Lock()
+    
+    def preload(self):
+        # gunicorn preload: import the client in the master. The model (and
+        # its gRPC channel) is still created per worker, after the fork.
+        if self.api_key:
+            import google.generativeai
+
+    @property
+    def model(self):
+        if not self.api_key:
+            return None
+        with self._model_lock:
+            if self._model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._model = genai.GenerativeModel('gemini-1.5-flash')
+        return self._model
     
     def _calculate_metrics(self, history):
-        if not history or len(history) < 2:
+        if history is None or len(history) < 2:
             return {}
         
-        closes = [h['close'] for h in history]
-        volumes = [h['volume'] for h in history]
-        
-        avg_price = sum(closes) / len(closes)
-        max_price = max(closes)
-        min_price = min(closes)
+        closes = history.close
+        volumes = history.volume
+
+        avg_price = float(closes.mean())
+        max_price = float(closes.max())
+        min_price = float(closes.min())
         price_range = max_price - min_price
-        
-        avg_volume = sum(volumes) / len(volumes)
-        
-        daily_returns = []
-        for i in range(1, len(closes)):
-            ret = (closes[i] - closes[i-1]) / closes[i-1] * 100
-            daily_returns.append(ret)
-        
-        avg_return = sum(daily_returns) / len(daily_returns) if daily_returns else 0
-        
-        variance = sum((r - avg_return) ** 2 for r in daily_returns) / len(daily_returns) if daily_returns else 0
-        volatility = variance ** 0.5
-        
-        positive_days = sum(1 for r in daily_returns if r > 0)
-        total_days = len(daily_returns)
-        win_rate = (positive_days / total_days * 100) if total_days > 0 else 0
-        
+
+        avg_volume = float(volumes.mean())
+
+        stats = return_stats(closes)
+        avg_return = float(stats["averageDailyReturn"])
+        volatility = float(stats["volatility"])
+        win_rate = float(stats["winRate"])
+        total_days = stats["totalTradingDays"]
+
         return {
             "averagePrice": round(avg_price, 2),
             "highestPrice": round(max_price, 2),
@@ -51,12 +80,8 @@ class AnalysisService:
             "totalTradingDays": total_days
         }
     
-    def _get_ai_analysis(self, symbol, stock_data, metrics):
-        if not self.model:
-            return self._get_fallback_analysis(symbol, stock_data, metrics)
-        
-        try:
-            prompt = f"""Analyze this stock and provide a brief investment analysis (3-4 sentences):
+    def _build_prompt(self, symbol, stock_data, metrics):
+        return f"""Analyze this stock and provide a brief investment analysis (3-4 sentences):
 
 Stock: {symbol}
 Current Price: {stock_data.get('currentPrice', 'N/A')}
@@ -74,10 +99,48 @@ Provide a concise analysis focusing on:
 
 Keep the response under 100 words and professional."""
 
-            response = self.model.generate_content(prompt)
-            return response.text
+    def _run_ai_analysis(self, job_id, symbol, prompt, fallback):
+        try:
+            with stage("gemini"):
+                response = self.model.generate_content(prompt)
+            result = {"status": "ready", "analysis": response.text}
+            ttl = AI_RESULT_TTL
         except Exception:
-            return self._get_fallback_analysis(symbol, stock_data, metrics)
+            result = {"status": "failed", "analysis": fallback}
+            ttl = AI_FAILURE_TTL
+        result.update({"jobId": job_id, "symbol": symbol})
+        self.ai_cache.set(f"ai_result_{job_id}", result, ttl=ttl)
+
+    def _get_ai_analysis(self, symbol, trading_day, stock_data, metrics, fallback):
+        if not self.api_key:
+            return {"status": "unavailable", "analysis": fallback, "jobId": None}
+
+        job_id = hashlib.sha1(f"{symbol}:{trading_day}".encode()).hexdigest()[:16]
+        result = self.ai_cache.get(f"ai_result_{job_id}")
+        if result is not None:
+            return result
+
+        # The lease makes check-and-submit atomic across workers.
+        pending_key = f"ai_pending_{job_id}"
+        with self._submit_lock, self.ai_cache.lock(pending_key):
+            result = self.ai_cache.get(f"ai_result_{job_id}")
+            if result is not None:
+                return result
+            if self.ai_cache.get(pending_key) is None:
+                self.ai_cache.set(pending_key, {"symbol": symbol}, ttl=AI_PENDING_TTL)
+                prompt = self._build_prompt(symbol, stock_data, metrics)
+                self.ai_executor.submit(self._run_ai_analysis, job_id, symbol, prompt, fallback)
+
+        return {"status": "pending", "analysis": fallback, "jobId": job_id}
+
+    def get_analysis_job(self, job_id):
+        result = self.ai_cache.get(f"ai_result_{job_id}")
+        if result is not None:
+            return result
+        pending = self.ai_cache.get(f"ai_pending_{job_id}")
+        if pending is not None:
+            return {"status": "pending", "analysis": None, "jobId": job_id, "symbol": pending["symbol"]}
+        return None
     
     def _get_fallback_analysis(self, symbol, stock_data, metrics):
         change_percent = stock_data.get('changePercent', 0)
@@ -113,29 +176,45 @@ Keep the response under 100 words and professional."""
         return analysis
     
     def analyze(self, symbol, stock_data):
+        # Metrics and the rule-based text are returned right away; the LLM
+        # text replaces them once its background job has finished.
         try:
-            history = stock_data.get('history', [])
-            metrics = self._calculate_metrics(history)
-            ai_analysis = self._get_ai_analysis(symbol, stock_data, metrics)
-            
-            change_percent = stock_data.get('changePercent', 0)
-            if change_percent > 1:
-                sentiment = "Bullish"
-            elif change_percent < -1:
-                sentiment = "Bearish"
-            else:
-                sentiment = "Neutral"
-            
+            history = stock_data.get('history')
+            trading_day = str(history.date[-1]) if history is not None and len(history) else None
+            cache_key = f"analysis_{symbol}_{history.fingerprint()}" if trading_day else None
+
+            result = self.cache.get(cache_key) if cache_key else None
+            if result is None:
+                metrics = self._calculate_metrics(history)
+
+                change_percent = stock_data.get('changePercent', 0)
+                if change_percent > 1:
+                    sentiment = "Bullish"
+                elif change_percent < -1:
+                    sentiment = "Bearish"
+                else:
+                    sentiment = "Neutral"
+
+                result = {
+                    "symbol": symbol,
+                    "name": stock_data.get('name', symbol),
+                    "currentPrice": stock_data.get('currentPrice'),
+                    "change": stock_data.get('change'),
+                    "changePercent": stock_data.get('changePercent'),
+                    "metrics": metrics,
+                    "analysis": self._get_fallback_analysis(symbol, stock_data, metrics),
+                    "sentiment": sentiment,
+                    "generatedAt": datetime.now().isoformat()
+                }
+                if cache_key:
+                    self.cache.set(cache_key, result)
+
+            ai = self._get_ai_analysis(symbol, trading_day, stock_data, result["metrics"], result["analysis"])
             return {
-                "symbol": symbol,
-                "name": stock_data.get('name', symbol),
-                "currentPrice": stock_data.get('currentPrice'),
-                "change": stock_data.get('change'),
-                "changePercent": stock_data.get('changePercent'),
-                "metrics": metrics,
-                "analysis": ai_analysis,
-                "sentiment": sentiment,
-                "generatedAt": datetime.now().isoformat()
+                **result,
+                "analysis": ai["analysis"],
+                "analysisStatus": ai["status"],
+                "analysisJobId": ai["jobId"]
             }
         except Exception as e:
             raise Exception(f"Analysis error: {str(e)}")
@@ -0,0 +1,466 @@
+import os
+import time
+import asyncio
+import pickle
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "cache.sqlite3")
+
+# ---------------- Rate Limiter ----------------
+
+# Both policies keep three numbers per key, whatever the call volume.
+#   window  sliding-window counter: calls in the current fixed window plus
+#           the previous window's count, weighted by how much of it still
+#           overlaps the sliding window.
+#   bucket  token bucket: bursts of up to max_calls, refilled at
+#           max_calls / window tokens per second.
+# step() takes a key's state (None for a new key) and returns the new
+# state, the time after which that state is no different from a new key
+# (so it can be swept) and the seconds to wait before retrying (0 when the
+# call is admitted).
+
+class SlidingWindowCounter:
+    mode = "window"
+
+    def __init__(self, max_calls, window):
+        self.max_calls = max_calls
+        self.window = window
+
+    def step(self, state, now):
+        index = now // self.window
+        previous = current = 0
+        if state is not None:
+            state_index, previous, current = state
+            if state_index != index:
+                previous = current if index - state_index == 1 else 0
+                current = 0
+
+        start = index * self.window
+        expires = start + 2 * self.window
+        weight = 1 - (now - start) / self.window
+        if previous * weight + current + 1 <= self.max_calls:
+            return (index, previous, current + 1), expires, 0.0
+
+        room = self.max_calls - 1
+        if current <= room:
+            # Admitted once enough of the previous window has slid out.
+            wait = start + self.window * (1 - (room - current) / previous) - now
+        else:
+            # Not before the next window, where this one becomes "previous".
+            wait = start + self.window * (2 - room / current) - now
+        return (index, previous, current), expires, max(wait, 0.001)
+
+
+class TokenBucket:
+    mode = "bucket"
+
+    def __init__(self, max_calls, window):
+        self.max_calls = max_calls
+        self.window = window
+        self.rate = max_calls / window
+
+    def step(self, state, now):
+        tokens = self.max_calls
+        if state is not None:
+            tokens = min(self.max_calls, state[0] + (now - state[1]) * self.rate)
+
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        expires = now + (self.max_calls - tokens) / self.rate
+        return (tokens, now, 0), expires, wait
+
+
+RATE_LIMIT_POLICIES = {"window": SlidingWindowCounter, "bucket": TokenBucket}
+
+
+class MemoryRateLimiter:
+    # Per-process. Keys whose state has expired are swept every
+    # sweep_interval seconds, so idle clients do not accumulate.
+    blocking = False
+
+    def __init__(self, policy, sweep_interval=60):
+        self.policy = policy
+        self.sweep_interval = sweep_interval
+        self.states = {}
+        self.limited = 0
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+
+    def _sweep(self, now):
+        self._last_sweep = now
+        for key in [key for key, (_, expires) in self.states.items() if expires <= now]:
+            del self.states[key]
+
+    def acquire(self, key):
+        # Seconds until the call would be admitted; 0 means it was.
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(now)
+            state, expires = self.states.get(key, (None, 0))
+            state, expires, wait = self.policy.step(state if expires > now else None, now)
+            self.states[key] = (state, expires)
+            if wait:
+                self.limited += 1
+            return wait
+
+    def allow(self, key):
+        return self.acquire(key) == 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "mode": self.policy.mode,
+                "maxCalls": self.policy.max_calls,
+                "window": self.policy.window,
+                "keys": len(self.states),
+                "limited": self.limited,
+            }
+
+# ---------------- Cache ----------------
+
+def estimate_size(value):
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    # Bounded by entry count and estimated payload bytes. Expired entries
+    # are swept every sweep_interval seconds, not only when read again.
+    blocking = False
+
+    def __init__(self, ttl=300, max_entries=512, max_bytes=64 * 1024 * 1024, sweep_interval=30):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            self._maybe_sweep(now)
+            entry = self.cache.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires, _ = entry
+            if expires <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        size = estimate_size(value)
+        with self._lock:
+            if key in self.cache:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self.cache[key] = (value, now + (ttl if ttl is not None else self.ttl), size)
+            self.bytes += size
+            self._maybe_sweep(now)
+            while len(self.cache) > self.max_entries or self.bytes > self.max_bytes:
+                oldest = next(iter(self.cache))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def lock(self, key):
+        return nullcontext()
+
+    def sweep(self):
+        with self._lock:
+            self._sweep(time.time())
+
+    def _maybe_sweep(self, now):
+        if now - self._last_sweep >= self.sweep_interval:
+            self._sweep(now)
+
+    def _sweep(self, now):
+        expired = [k for k, (_, expires, _) in self.cache.items() if expires <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        self._last_sweep = now
+
+    def _remove(self, key):
+        _, _, size = self.cache.pop(key)
+        self.bytes -= size
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "entries": len(self.cache),
+                "bytes": self.bytes,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRatio": round(self.hits / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+# ---------------- SQLite (shared) ----------------
+
+# A WAL-mode SQLite file lets every gunicorn worker on the host share one
+# cache and one rate-limit budget. Each thread keeps its own connection.
+
+class _SqliteBackend:
+    # Calls wait on file locks (up to the 30s busy timeout) and unpickle
+    # values, so async code runs them off the event loop (run_backend).
+    blocking = True
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._init_schema()
+
+    def _conn(self):
+        # A connection opened before a fork (gunicorn preload) belongs to the
+        # parent; a forked worker opens its own.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _init_schema(self):
+        pass
+
+
+class SqliteCache(_SqliteBackend):
+    # Every cache shares one file; rows are namespaced by the cache name, so
+    # max_entries, eviction and stats apply to each cache separately.
+    def __init__(self, path, name, ttl=300, max_entries=512, lease_timeout=30, poll_interval=0.05):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        super().__init__(path)
+
+    def _init_schema(self):
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(name TEXT, key TEXT, value BLOB, expires REAL, PRIMARY KEY (name, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (name, expires)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases (name TEXT, key TEXT, expires REAL, PRIMARY KEY (name, key))"
+        )
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value, expires FROM cache WHERE name = ? AND key = ?", (self.name, key)
+        ).fetchone()
+        if row and row[1] > time.time():
+            self.hits += 1
+            return pickle.loads(row[0])
+        self.misses += 1
+        return None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (name, key, value, expires) VALUES (?, ?, ?, ?)",
+                (self.name, key, blob, now + (ttl if ttl is not None else self.ttl)),
+            )
+            conn.execute("DELETE FROM cache WHERE name = ? AND expires <= ?", (self.name, now))
+            evicted = conn.execute(
+                "DELETE FROM cache WHERE name = ? AND key IN "
+                "(SELECT key FROM cache WHERE name = ? ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                (self.name, self.name, self.max_entries),
+            ).rowcount
+            self.evictions += max(evicted, 0)
+
+    def stats(self):
+        # Hit/miss/eviction counters are per process; entries and bytes
+        # describe this cache's rows in the shared file.
+        entries, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache WHERE name = ?", (self.name,)
+        ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "entries": entries,
+            "bytes": size,
+            "maxEntries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+        }
+
+    def _try_lease(self, key):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT expires FROM leases WHERE name = ? AND key = ?", (self.name, key)
+            ).fetchone()
+            if row and row[0] > now:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (name, key, expires) VALUES (?, ?, ?)",
+                (self.name, key, now + self.lease_timeout),
+            )
+            return True
+
+    @contextmanager
+    def lock(self, key):
+        # Cross-process lease: only one worker fills a given key at a time.
+        # A lease left behind by a crashed worker expires after lease_timeout.
+        while not self._try_lease(key):
+            time.sleep(self.poll_interval)
+        try:
+            yield
+        finally:
+            self._conn().execute("DELETE FROM leases WHERE name = ? AND key = ?", (self.name, key))
+
+
+class SqliteRateLimiter(_SqliteBackend):
+    # One row per key, shared by every worker; expired rows are deleted
+    # every sweep_interval seconds (per process).
+    def __init__(self, path, policy, sweep_interval=60):
+        self.policy = policy
+        self.sweep_interval = sweep_interval
+        self.limited = 0
+        self._last_sweep = time.time()
+        super().__init__(path)
+
+    def _init_schema(self):
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits "
+            "(key TEXT PRIMARY KEY, a REAL, b REAL, c REAL, expires REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS rate_limits_expires ON rate_limits (expires)")
+
+    def acquire(self, key):
+        now = time.time()
+        with self._transaction() as conn:
+            if now - self._last_sweep >= self.sweep_interval:
+                self._last_sweep = now
+                conn.execute("DELETE FROM rate_limits WHERE expires <= ?", (now,))
+            row = conn.execute(
+                "SELECT a, b, c, expires FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            state, expires, wait = self.policy.step(row[:3] if row is not None and row[3] > now else None, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (key, a, b, c, expires) VALUES (?, ?, ?, ?, ?)",
+                (key, *state, expires)
+            )
+        if wait:
+            self.limited += 1
+        return wait
+
+    def allow(self, key):
+        return self.acquire(key) == 0
+
+    def stats(self):
+        keys = self._conn().execute(
+            "SELECT COUNT(*) FROM rate_limits WHERE expires > ?", (time.time(),)
+        ).fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "mode": self.policy.mode,
+            "maxCalls": self.policy.max_calls,
+            "window": self.policy.window,
+            "keys": keys,
+            "limited": self.limited,
+        }
+
+# ---------------- Factories ----------------
+
+# STOCK_CACHE_BACKEND=memory keeps a per-process LRU cache (default);
+# STOCK_CACHE_BACKEND=sqlite shares state through STOCK_CACHE_PATH.
+
+def _backend():
+    return os.environ.get("STOCK_CACHE_BACKEND", "memory").lower()
+
+
+def _sqlite_path():
+    return os.environ.get("STOCK_CACHE_PATH", DEFAULT_SQLITE_PATH)
+
+
+def create_cache(name, ttl=300, backend=None):
+    # name keeps each cache's entries apart in the shared SQLite file;
+    # backend overrides STOCK_CACHE_BACKEND for state that must be shared.
+    max_entries = int(os.environ.get("STOCK_CACHE_MAX_ENTRIES", 512))
+    if (backend or _backend()) == "sqlite":
+        return SqliteCache(_sqlite_path(), name, ttl=ttl, max_entries=max_entries)
+    max_bytes = int(os.environ.get("STOCK_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    return LRUCache(ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+
+
+def parse_rate_limit(spec):
+    # "120/60" -> (120, 60.0): calls per window seconds. "" or "0" -> None.
+    calls, _, window = (spec or "").strip().partition("/")
+    if not calls or int(calls) <= 0:
+        return None
+    return int(calls), float(window or 60)
+
+
+def create_rate_limiter(max_calls=5, window=60):
+    # STOCK_RATE_LIMIT_MODE picks the policy: window (default) or bucket.
+    mode = os.environ.get("STOCK_RATE_LIMIT_MODE", "window").lower()
+    policy = RATE_LIMIT_POLICIES.get(mode, SlidingWindowCounter)(max_calls, window)
+    if _backend() == "sqlite":
+        return SqliteRateLimiter(_sqlite_path(), policy)
+    return MemoryRateLimiter(policy)
+
+
+async def run_backend(backend, func, *args, **kwargs):
+    # Call func (a cache or limiter operation) from async code: in a thread
+    # for blocking backends, inline for the in-process ones.
+    if backend.blocking:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return func(*args, **kwargs)
@@ -0,0 +1,75 @@
+import numpy as np
+
+# ---------------- Bars ----------------
+
+# Column-oriented daily bars. Services work on the NumPy columns directly;
+# JSON records are only built at the response boundary by to_records().
+
+class Bars:
+    __slots__ = ("date", "open", "high", "low", "close", "volume")
+
+    def __init__(self, date, open, high, low, close, volume):
+        self.date = date
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def from_structured(cls, arr):
+        return cls(
+            np.ascontiguousarray(arr["date"]),
+            np.ascontiguousarray(arr["open"]),
+            np.ascontiguousarray(arr["high"]),
+            np.ascontiguousarray(arr["low"]),
+            np.ascontiguousarray(arr["close"]),
+            np.ascontiguousarray(arr["volume"]),
+        )
+
+    def __len__(self):
+        return len(self.close)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("Bars only support slicing")
+        return Bars(
+            self.date[index],
+            self.open[index],
+            self.high[index],
+            self.low[index],
+            self.close[index],
+            self.volume[index],
+        )
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+    def to_columns(self):
+        # Parallel arrays, one per field: the compact wire format.
+        return {
+            "date": np.datetime_as_string(self.date, unit="D").tolist(),
+            "open": np.round(self.open, 2).tolist(),
+            "high": np.round(self.high, 2).tolist(),
+            "low": np.round(self.low, 2).tolist(),
+            "close": np.round(self.close, 2).tolist(),
+            "volume": self.volume.tolist(),
+        }
+
+    def to_records(self):
+        columns = self.to_columns()
+        return [
+            {"date": d, "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for d, o, h, l, c, v in zip(*columns.values())
+        ]
+
+    def fingerprint(self):
+        # Cheap content version: length, the first bar's date and close, and
+        # the whole last bar. Updates rewrite the newest bars; a back-adjusted
+        # history (split, dividend) is replaced whole and changes the first
+        # close, so older bars need not be compared.
+        if not len(self):
+            return "empty"
+        last = (self.date[-1], self.open[-1], self.high[-1], self.low[-1], self.close[-1], self.volume[-1])
+        return f"{len(self)}:{self.date[0]}:{self.close[0]}:" + ":".join(str(v) for v in last)
@@ -0,0 +1,100 @@
+import os
+import re
+import tempfile
+import threading
+import numpy as np
+
+BAR_DTYPE = np.dtype([
+    ("date", "datetime64[D]"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "i8"),
+])
+
+DEFAULT_HISTORY_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "history")
+
+_KEY_RE = re.compile(r"^[a-z0-9^_.-]+$")
+
+
+def empty_bars():
+    return np.empty(0, dtype=BAR_DTYPE)
+
+
+# ---------------- History Store ----------------
+
+# Daily OHLCV bars are kept on disk as one memory-mapped .npy file per symbol,
+# so history survives restarts and only new bars need to be downloaded.
+
+class HistoryStore:
+    def __init__(self, root=None):
+        self.root = root or os.environ.get("STOCK_HISTORY_DIR", DEFAULT_HISTORY_DIR)
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        if not _KEY_RE.match(key):
+            raise ValueError(f"Invalid history key: {key}")
+        return os.path.join(self.root, f"{key}.npy")
+
+    def load(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return empty_bars()
+        return np.load(path, mmap_mode="r")
+
+    def resume_date(self, key):
+        # Incremental downloads start at the last settled bar (the one before
+        # the newest, which may be a partial session bar), so that every
+        # download overlaps one bar whose close should not have changed.
+        bars = self.load(key)
+        if not len(bars):
+            return None
+        return bars["date"][-2] if len(bars) > 1 else bars["date"][-1]
+
+    def revised(self, key, bars):
+        # True when a settled stored bar comes back with a different close:
+        # Stooq back-adjusts older prices after splits and dividends, so
+        # the stored history no longer lines up and must be replaced.
+        existing = self.load(key)
+        if len(existing) < 2 or not len(bars):
+            return False
+        settled = existing[:-1]
+        overlap = np.isin(bars["date"], settled["date"])
+        if not overlap.any():
+            return False
+        stored = settled["close"][np.isin(settled["date"], bars["date"][overlap])]
+        return not np.allclose(stored, bars["close"][overlap], rtol=1e-6, atol=0)
+
+    def merge(self, key, bars):
+        # Bars on or after the first incoming date are replaced, so a partial
+        # intraday bar stored earlier gets overwritten by its final values.
+        if not len(bars):
+            return self.load(key)
+
+        with self._lock:
+            existing = self.load(key)
+            if len(existing):
+                existing = existing[existing["date"] < bars["date"][0]]
+            self._write(key, np.concatenate([np.asarray(existing, dtype=BAR_DTYPE), bars]))
+
+        return self.load(key)
+
+    def replace(self, key, bars):
+        if not len(bars):
+            return self.load(key)
+        with self._lock:
+            self._write(key, bars)
+        return self.load(key)
+
+    def _write(self, key, bars):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, bars)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,383 @@
+import os
+import math
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from .backends import create_rate_limiter, parse_rate_limit, run_backend
+from .metrics import REGISTRY
+
+# ---------------- Exceptions ----------------
+
+class UpstreamUnavailable(Exception):
+    pass
+
+
+class RateLimitException(Exception):
+    # retry_after: seconds until the limiter would admit the call.
+    def __init__(self, message="Rate limit exceeded", retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_seconds(self):
+        # Whole seconds, as sent in a Retry-After header.
+        return max(1, math.ceil(self.retry_after))
+
+# ---------------- Circuit Breaker ----------------
+
+# After failure_threshold consecutive failures the circuit opens and calls
+# fail fast for reset_timeout seconds; then a single trial call is let
+# through and its outcome closes or re-opens the circuit.
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.time() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.time()
+
+# ---------------- Latency Stats ----------------
+
+class LatencyStats:
+    def __init__(self, max_samples=1024):
+        self.samples = deque(maxlen=max_samples)
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.limited = 0
+        self.status_counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, seconds, status=None):
+        with self._lock:
+            self.requests += 1
+            self.samples.append(seconds)
+            if status is None:
+                self.errors += 1
+                status = "error"
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self.samples)
+            stats = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "limited": self.limited,
+                "statusCounts": {str(k): v for k, v in self.status_counts.items()},
+            }
+        if samples:
+            stats.update({
+                "p50Ms": round(samples[len(samples) // 2] * 1000, 1),
+                "p99Ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 1),
+                "maxMs": round(samples[-1] * 1000, 1),
+            })
+        return stats
+
+# ---------------- Upstream Client ----------------
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# STOCK_UPSTREAM_RATE_LIMITS caps calls per upstream across all symbols and
+# clients ("name=calls/seconds", comma-separated); upstreams not listed are
+# not limited. A call over the limit raises RateLimitException.
+DEFAULT_UPSTREAM_RATE_LIMITS = "stooq=300/60,huggingface=60/60"
+
+
+def _upstream_limiter(name):
+    for entry in os.environ.get("STOCK_UPSTREAM_RATE_LIMITS", DEFAULT_UPSTREAM_RATE_LIMITS).split(","):
+        upstream, _, spec = entry.partition("=")
+        if upstream.strip() == name:
+            limit = parse_rate_limit(spec)
+            return create_rate_limiter(*limit) if limit else None
+    return None
+
+
+def _rate_limited(name, latency, wait):
+    latency.limited += 1
+    return RateLimitException(f"{name} rate limit exceeded", retry_after=wait)
+
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "stockapp_upstream_request_duration_seconds",
+    "Latency of individual upstream HTTP attempts, retries included.",
+    ("upstream",)
+)
+
+
+def _backoff(attempt, retries, backoff, max_backoff, give_up):
+    # Full-jitter delay before the next attempt, or None when the attempts
+    # or the overall deadline are used up. Full jitter keeps retries from
+    # many workers from lining up.
+    if attempt >= retries:
+        return None
+    delay = random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
+    if time.monotonic() + delay >= give_up:
+        return None
+    return delay
+
+
+def _attempt_timeout(timeout, give_up):
+    # (connect, read) for one attempt, cut down to what is left of the deadline.
+    connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    remaining = max(give_up - time.monotonic(), 0.01)
+    return min(connect, remaining), min(read, remaining)
+
+
+class UpstreamClient:
+    # A call, retries included, never takes longer than deadline seconds
+    # (default: one attempt's connect + read timeout). Connection errors and
+    # retryable statuses are retried; read timeouts are not, since a second
+    # attempt against a slow upstream would only hold the worker longer.
+    def __init__(self, name, pool_maxsize=10, timeout=(3.05, 10), retries=2,
+                 backoff=0.25, max_backoff=2.0, failure_threshold=5, reset_timeout=30, deadline=None):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline if deadline is not None else sum(_attempt_timeout(timeout, float("inf")))
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = LatencyStats()
+        self.limiter = _upstream_limiter(name)
+
+        # pool_block caps concurrent connections per host at pool_maxsize.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _observe(self, start, status=None):
+        elapsed = time.perf_counter() - start
+        self.latency.record(elapsed, status)
+        UPSTREAM_SECONDS.observe(elapsed, upstream=self.name)
+
+    def request(self, method, url, **kwargs):
+        if self.limiter is not None:
+            wait = self.limiter.acquire(f"upstream:{self.name}")
+            if wait:
+                raise _rate_limited(self.name, self.latency, wait)
+        if not self.breaker.allow():
+            self.latency.rejected += 1
+            raise UpstreamUnavailable(f"{self.name} circuit open")
+
+        # Every way out reports to the breaker, so a half-open trial can
+        # never be left running.
+        try:
+            response = self._attempts(method, url, **kwargs)
+        except BaseException:
+            self.breaker.record_failure()
+            raise
+        else:
+            if response.status_code in RETRY_STATUSES:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+
+    def _attempts(self, method, url, **kwargs):
+        timeout = kwargs.pop("timeout", self.timeout)
+        give_up = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=_attempt_timeout(timeout, give_up), **kwargs)
+            except requests.RequestException as e:
+                self._observe(start)
+                delay = None
+                if isinstance(e, requests.ConnectionError):
+                    delay = _backoff(attempt, self.retries, self.backoff, self.max_backoff, give_up)
+                if delay is None:
+                    raise
+            else:
+                self._observe(start, response.status_code)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                delay = _backoff(attempt, self.retries, self.backoff, self.max_backoff, give_up)
+                if delay is None:
+                    return response
+            self.latency.retries += 1
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        stats = self.latency.snapshot()
+        stats["circuit"] = self.breaker.state
+        return stats
+
+# ---------------- Async Upstream Client ----------------
+
+# httpx-based twin of UpstreamClient for the ASGI serving mode. It shares
+# the circuit breaker, latency stats and rate limiter of the sync client
+# with the same name, so both paths see one circuit state and one budget
+# and report as one upstream.
+# httpx is only imported here; the sync app does not need it.
+
+class AsyncUpstreamClient:
+    def __init__(self, name, breaker, latency, limiter=None, max_connections=100, timeout=(3.05, 10),
+                 retries=2, backoff=0.25, max_backoff=2.0, deadline=None):
+        import httpx
+
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline if deadline is not None else sum(_attempt_timeout(timeout, float("inf")))
+        self.breaker = breaker
+        self.latency = latency
+        self.limiter = limiter
+        self._httpx = httpx
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
+        )
+
+    def _observe(self, start, status=None):
+        elapsed = time.perf_counter() - start
+        self.latency.record(elapsed, status)
+        UPSTREAM_SECONDS.observe(elapsed, upstream=self.name)
+
+    async def request(self, method, url, **kwargs):
+        if self.limiter is not None:
+            wait = await run_backend(self.limiter, self.limiter.acquire, f"upstream:{self.name}")
+            if wait:
+                raise _rate_limited(self.name, self.latency, wait)
+        if not self.breaker.allow():
+            self.latency.rejected += 1
+            raise UpstreamUnavailable(f"{self.name} circuit open")
+
+        # Same deadline, retry and breaker rules as UpstreamClient.request;
+        # cancellation counts as a failure too.
+        try:
+            response = await self._attempts(method, url, **kwargs)
+        except BaseException:
+            self.breaker.record_failure()
+            raise
+        else:
+            if response.status_code in RETRY_STATUSES:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+
+    async def _attempts(self, method, url, **kwargs):
+        httpx = self._httpx
+        give_up = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            connect, read = _attempt_timeout(self.timeout, give_up)
+            start = time.perf_counter()
+            try:
+                response = await self.client.request(
+                    method, url, timeout=httpx.Timeout(read, connect=connect), **kwargs
+                )
+            except Exception as e:
+                self._observe(start)
+                delay = None
+                if isinstance(e, httpx.TransportError) and not isinstance(e, httpx.ReadTimeout):
+                    delay = _backoff(attempt, self.retries, self.backoff, self.max_backoff, give_up)
+                if delay is None:
+                    raise
+            else:
+                self._observe(start, response.status_code)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                delay = _backoff(attempt, self.retries, self.backoff, self.max_backoff, give_up)
+                if delay is None:
+                    return response
+            self.latency.retries += 1
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+# ---------------- Registry ----------------
+
+_clients = {}
+_async_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name, **kwargs):
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = UpstreamClient(name, **kwargs)
+            _clients[name] = client
+        return client
+
+
+def get_async_client(name, **kwargs):
+    # One async client per name and process; it must be used from a single
+    # event loop (the ASGI server's).
+    with _clients_lock:
+        client = _async_clients.get(name)
+        if client is None:
+            sync = _clients.get(name) or UpstreamClient(name)
+            _clients.setdefault(name, sync)
+            client = AsyncUpstreamClient(name, sync.breaker, sync.latency, sync.limiter, **kwargs)
+            _async_clients[name] = client
+        return client
+
+
+async def close_async_clients():
+    with _clients_lock:
+        clients = list(_async_clients.values())
+        _async_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+def upstream_stats():
+    with _clients_lock:
+        clients = list(_clients.values())
+    return {client.name: client.stats() for client in clients}
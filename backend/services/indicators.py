@@ -0,0 +1,307 @@
+from collections import deque
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ---------------- Indicators ----------------
+
+# Full rolling indicator series computed with NumPy along the last axis, so
+# the same functions work for one symbol (1-D) or a stack of symbols (2-D).
+# Positions without enough history are NaN.
+
+
+def _windows(x, n):
+    return sliding_window_view(x, n, axis=-1)
+
+
+def _pad(x, values, n):
+    out = np.full(x.shape, np.nan)
+    out[..., n - 1:] = values
+    return out
+
+
+def sma(x, n):
+    x = np.asarray(x, dtype=float)
+    if x.shape[-1] < n:
+        return np.full(x.shape, np.nan)
+    return _pad(x, _windows(x, n).mean(axis=-1), n)
+
+
+def rolling_std(x, n):
+    x = np.asarray(x, dtype=float)
+    if x.shape[-1] < n:
+        return np.full(x.shape, np.nan)
+    return _pad(x, _windows(x, n).std(axis=-1), n)
+
+
+def _smooth(values, alpha, seed_len):
+    # y[seed_len-1] = mean of the first seed_len values, then
+    # y[t] = (1 - alpha) * y[t-1] + alpha * values[t].
+    # The recurrence is solved in closed form one block at a time; blocks are
+    # short enough that the (1 - alpha) ** -k scaling stays well inside float
+    # range.
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    length = values.shape[-1]
+    if length < seed_len:
+        return out
+
+    decay = 1.0 - alpha
+    block = max(1, int(np.log(1e12) / -np.log(decay))) if decay > 0 else 1
+    y = values[..., :seed_len].mean(axis=-1)
+    out[..., seed_len - 1] = y
+
+    for start in range(seed_len, length, block):
+        chunk = values[..., start:start + block]
+        powers = decay ** np.arange(1, chunk.shape[-1] + 1)
+        segment = powers * (y[..., None] + alpha * np.cumsum(chunk / powers, axis=-1))
+        out[..., start:start + chunk.shape[-1]] = segment
+        y = segment[..., -1]
+    return out
+
+
+def ema(x, n):
+    return _smooth(x, 2.0 / (n + 1), n)
+
+
+def wilder_rsi(close, n=14):
+    close = np.asarray(close, dtype=float)
+    out = np.full(close.shape, np.nan)
+    if close.shape[-1] <= n:
+        return out
+
+    deltas = np.diff(close, axis=-1)
+    avg_gain = _smooth(np.where(deltas > 0, deltas, 0.0), 1.0 / n, n)
+    avg_loss = _smooth(np.where(deltas < 0, -deltas, 0.0), 1.0 / n, n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, 100.0, rsi)
+    out[..., 1:] = np.where(np.isnan(avg_gain), np.nan, rsi)
+    return out
+
+
+def atr(high, low, close, n=14):
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    prev_close = np.concatenate([close[..., :1], close[..., :-1]], axis=-1)
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return _smooth(true_range, 1.0 / n, n)
+
+
+def bollinger(close, n=20, k=2.0):
+    middle = sma(close, n)
+    width = k * rolling_std(close, n)
+    return middle - width, middle, middle + width
+
+
+def rolling_volatility(close, n=20):
+    # Standard deviation of price over the window as a percentage of its mean.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return rolling_std(close, n) / sma(close, n) * 100
+
+
+def momentum(close, n=5):
+    # Percent change across an n-bar window (first to last bar of the window).
+    close = np.asarray(close, dtype=float)
+    out = np.full(close.shape, np.nan)
+    if close.shape[-1] >= n:
+        base = close[..., :close.shape[-1] - n + 1]
+        out[..., n - 1:] = (close[..., n - 1:] - base) / base * 100
+    return out
+
+
+def daily_returns(close):
+    close = np.asarray(close, dtype=float)
+    return np.diff(close, axis=-1) / close[..., :-1] * 100
+
+
+def return_stats(close):
+    returns = daily_returns(close)
+    return {
+        "averageDailyReturn": returns.mean(axis=-1),
+        "volatility": returns.std(axis=-1),
+        "winRate": (returns > 0).mean(axis=-1) * 100,
+        "totalTradingDays": returns.shape[-1],
+    }
+
+
+def compute_indicators(bars):
+    lower, middle, upper = bollinger(bars.close, 20)
+    return {
+        "sma5": sma(bars.close, 5),
+        "sma20": sma(bars.close, 20),
+        "ema12": ema(bars.close, 12),
+        "ema26": ema(bars.close, 26),
+        "rsi14": wilder_rsi(bars.close, 14),
+        "atr14": atr(bars.high, bars.low, bars.close, 14),
+        "bollingerLower": lower,
+        "bollingerMiddle": middle,
+        "bollingerUpper": upper,
+        "volatility20": rolling_volatility(bars.close, 20),
+        "momentum5": momentum(bars.close, 5),
+    }
+
+
+def latest_indicators(close):
+    # Snapshot used by PredictionService. Windows shrink to the available
+    # history for short series, and RSI reads neutral (50) until it has
+    # enough bars.
+    close = np.asarray(close, dtype=float)
+    length = len(close)
+    window = min(20, length)
+    rsi = wilder_rsi(close, 14)[-1] if length > 14 else 50.0
+    return {
+        "sma_5": round(float(close[-min(5, length):].mean()), 2),
+        "sma_20": round(float(close[-window:].mean()), 2),
+        "rsi": round(float(rsi), 2),
+        "volatility": round(float(rolling_volatility(close, window)[-1]), 2) if length >= 2 else 0,
+        "momentum": round(float(momentum(close, 5)[-1]), 2) if length >= 5 else 0,
+    }
+
+
+# ---------------- Incremental State ----------------
+
+# Running indicator state for one symbol, updated in O(1) per new bar. After
+# feeding bars in order, snapshot() equals the last element of each series
+# from compute_indicators() over the same bars, and latest() equals
+# latest_indicators() over the closes.
+
+class _Smoother:
+    __slots__ = ("alpha", "seed_len", "count", "total", "value")
+
+    def __init__(self, alpha, seed_len):
+        self.alpha = alpha
+        self.seed_len = seed_len
+        self.count = 0
+        self.total = 0.0
+        self.value = float("nan")
+
+    def update(self, x):
+        self.count += 1
+        if self.count < self.seed_len:
+            self.total += x
+        elif self.count == self.seed_len:
+            self.value = (self.total + x) / self.seed_len
+        else:
+            self.value = (1 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+
+class _Window:
+    __slots__ = ("size", "values", "total")
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+
+    def update(self, x):
+        if len(self.values) == self.size:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+
+    def full(self):
+        return len(self.values) == self.size
+
+    def mean(self):
+        return self.total / len(self.values)
+
+    def std(self):
+        # Two-pass over the (fixed-size) window avoids the cancellation of a
+        # running sum of squares on price-sized values.
+        mean = self.total / len(self.values)
+        return (sum((v - mean) ** 2 for v in self.values) / len(self.values)) ** 0.5
+
+
+class IndicatorState:
+    def __init__(self):
+        self.count = 0
+        self.last_date = None
+        self.prev_close = None
+        self.window5 = _Window(5)
+        self.window20 = _Window(20)
+        self.ema12 = _Smoother(2.0 / 13, 12)
+        self.ema26 = _Smoother(2.0 / 27, 26)
+        self.avg_gain = _Smoother(1.0 / 14, 14)
+        self.avg_loss = _Smoother(1.0 / 14, 14)
+        self.atr = _Smoother(1.0 / 14, 14)
+        # Welford running mean/variance of daily returns over all bars.
+        self.returns = 0
+        self.return_mean = 0.0
+        self.return_m2 = 0.0
+        self.positive_returns = 0
+
+    def update(self, date, high, low, close):
+        if self.prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+            delta = close - self.prev_close
+            self.avg_gain.update(delta if delta > 0 else 0.0)
+            self.avg_loss.update(-delta if delta < 0 else 0.0)
+
+            ret = delta / self.prev_close * 100
+            self.returns += 1
+            diff = ret - self.return_mean
+            self.return_mean += diff / self.returns
+            self.return_m2 += diff * (ret - self.return_mean)
+            if ret > 0:
+                self.positive_returns += 1
+
+        self.atr.update(true_range)
+        self.ema12.update(close)
+        self.ema26.update(close)
+        self.window5.update(close)
+        self.window20.update(close)
+        self.prev_close = close
+        self.last_date = date
+        self.count += 1
+
+    def update_bars(self, bars):
+        for date, high, low, close in zip(bars.date, bars.high.tolist(), bars.low.tolist(), bars.close.tolist()):
+            self.update(date, high, low, close)
+
+    def _rsi(self):
+        if self.avg_loss.count < 14:
+            return float("nan")
+        if self.avg_loss.value == 0:
+            return 100.0
+        return 100 - 100 / (1 + self.avg_gain.value / self.avg_loss.value)
+
+    def _momentum(self):
+        if not self.window5.full():
+            return float("nan")
+        base = self.window5.values[0]
+        return (self.window5.values[-1] - base) / base * 100
+
+    def snapshot(self):
+        nan = float("nan")
+        sma20 = self.window20.mean() if self.window20.full() else nan
+        std20 = self.window20.std() if self.window20.full() else nan
+        return {
+            "sma5": self.window5.mean() if self.window5.full() else nan,
+            "sma20": sma20,
+            "ema12": self.ema12.value,
+            "ema26": self.ema26.value,
+            "rsi14": self._rsi(),
+            "atr14": self.atr.value,
+            "bollingerLower": sma20 - 2 * std20,
+            "bollingerMiddle": sma20,
+            "bollingerUpper": sma20 + 2 * std20,
+            "volatility20": std20 / sma20 * 100,
+            "momentum5": self._momentum(),
+            "averageDailyReturn": self.return_mean if self.returns else nan,
+            "returnVolatility": (self.return_m2 / self.returns) ** 0.5 if self.returns else nan,
+            "winRate": self.positive_returns / self.returns * 100 if self.returns else nan,
+        }
+
+    def latest(self):
+        window20 = self.window20
+        return {
+            "sma_5": round(self.window5.mean(), 2),
+            "sma_20": round(window20.mean(), 2),
+            "rsi": round(self._rsi(), 2) if self.count > 14 else 50.0,
+            "volatility": round(window20.std() / window20.mean() * 100, 2) if self.count >= 2 else 0,
+            "momentum": round(self._momentum(), 2) if self.count >= 5 else 0,
+        }
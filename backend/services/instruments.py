@@ -0,0 +1,149 @@
+import os
+import re
+import math
+import csv
+from bisect import bisect_left
+
+DEFAULT_INSTRUMENTS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "instruments.csv")
+
+_NON_ALNUM = re.compile(r"[^A-Z0-9]+")
+
+# ---------------- Instrument Index ----------------
+
+# In-memory index over the instrument master, built once at startup.
+# Lookups go, in rank order, through: exact symbol, symbol prefix and
+# name-word prefix (bisect over sorted keys), then trigram overlap for
+# typos and substrings. Each tier only runs while the result list is short.
+
+MIN_FUZZY_SCORE = 0.6
+
+
+def _words(text):
+    return [w for w in _NON_ALNUM.split(text.upper()) if w]
+
+
+def _trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def load_instruments(path=None):
+    path = path or os.environ.get("STOCK_INSTRUMENTS_FILE", DEFAULT_INSTRUMENTS_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            {"symbol": row["symbol"].strip().upper(), "name": row["name"].strip(), "exchange": row["exchange"].strip().upper()}
+            for row in csv.DictReader(f)
+            if row.get("symbol")
+        ]
+
+
+class InstrumentIndex:
+    def __init__(self, instruments):
+        # Later duplicates of a symbol win, so a master file can override
+        # built-in entries.
+        by_symbol = {}
+        for item in instruments:
+            by_symbol[item["symbol"].upper()] = item
+        self.instruments = list(by_symbol.values())
+
+        self.symbol_ids = {}
+        self.by_exchange = {}
+        self._name_words = []
+        self._grams = []
+        symbol_keys = []
+        word_keys = []
+        trigrams = {}
+        for i, item in enumerate(self.instruments):
+            symbol = item["symbol"].upper()
+            self.symbol_ids[symbol] = i
+            self.by_exchange.setdefault(item["exchange"], []).append(i)
+            symbol_keys.append((symbol, i))
+
+            words = _words(item["name"])
+            self._name_words.append(words)
+            for word in words:
+                word_keys.append((word, i))
+            grams = set()
+            for word in words + ["".join(_words(symbol))]:
+                grams |= _trigrams(word)
+            self._grams.append(frozenset(grams))
+            for gram in grams:
+                trigrams.setdefault(gram, []).append(i)
+
+        symbol_keys.sort()
+        word_keys.sort()
+        self._symbol_keys = [k for k, _ in symbol_keys]
+        self._symbol_ids = [i for _, i in symbol_keys]
+        self._word_keys = [k for k, _ in word_keys]
+        self._word_ids = [i for _, i in word_keys]
+        self._trigrams = {gram: tuple(ids) for gram, ids in trigrams.items()}
+
+    def __len__(self):
+        return len(self.instruments)
+
+    def _prefix(self, keys, ids, prefix):
+        start = bisect_left(keys, prefix)
+        for pos in range(start, len(keys)):
+            if not keys[pos].startswith(prefix):
+                break
+            yield ids[pos]
+
+    def _fuzzy(self, query):
+        grams = set()
+        for word in _words(query):
+            grams |= _trigrams(word)
+        if not grams:
+            return []
+        needed = math.ceil(len(grams) * MIN_FUZZY_SCORE)
+        # A match shares at least `needed` trigrams with the query, so it must
+        # appear in one of the len(grams) - needed + 1 shortest posting lists.
+        # Only those are scanned; common trigrams ("BAN", "IND") never are.
+        postings = sorted((self._trigrams.get(gram, ()) for gram in grams), key=len)
+        candidates = set()
+        for ids in postings[:len(grams) - needed + 1]:
+            candidates.update(ids)
+        scored = []
+        for i in candidates:
+            count = len(grams & self._grams[i])
+            if count >= needed:
+                scored.append((-count, len(self.instruments[i]["symbol"]), i))
+        scored.sort()
+        return [i for _, _, i in scored]
+
+    def search(self, query, limit=10, exchange=None):
+        query = query.strip().upper()
+        if not query:
+            return []
+
+        seen = set()
+        results = []
+
+        def take(candidates):
+            for i in candidates:
+                if len(results) >= limit:
+                    return
+                if i in seen or (exchange and self.instruments[i]["exchange"] != exchange):
+                    continue
+                seen.add(i)
+                results.append(self.instruments[i])
+
+        exact = self.symbol_ids.get(query)
+        if exact is not None:
+            take([exact])
+        take(self._prefix(self._symbol_keys, self._symbol_ids, query))
+        words = _words(query)
+        if words and len(results) < limit:
+            # Every query word must prefix a word of the name; candidates come
+            # from the first word and are checked against the rest.
+            rest = words[1:]
+            take(
+                i for i in self._prefix(self._word_keys, self._word_ids, words[0])
+                if not rest or all(any(w.startswith(r) for w in self._name_words[i]) for r in rest)
+            )
+        if len(results) < limit:
+            take(self._fuzzy(query))
+        return results
+
+    def exchange(self, exchange):
+        return [self.instruments[i] for i in self.by_exchange.get(exchange.upper(), [])]
@@ -0,0 +1,148 @@
+import os
+import queue
+import asyncio
+import threading
+
+# ---------------- Live Price Hub ----------------
+
+# Fans one upstream poll per symbol out to every stream subscriber. A poller
+# thread runs only while a symbol has subscribers and publishes a quote only
+# when it differs from the last one sent.
+#
+# Under gunicorn each open stream holds a server thread for as long as it is
+# connected, so at most max_subscribers such streams are served per process
+# (STOCK_MAX_STREAMS, default 8 of the 16 gthread threads). In ASGI mode a
+# stream is a coroutine reading a LoopQueue, and the separate, much larger
+# max_async_subscribers cap applies (STOCK_MAX_ASYNC_STREAMS). Beyond either
+# cap subscribe() returns None and the client is expected to fall back to
+# polling /live.
+
+class LoopQueue:
+    # Subscription read by a coroutine: the poller thread hands each event
+    # to the event loop, which queues it (dropping the oldest when full).
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put_nowait(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self._offer, item)
+        except RuntimeError:
+            # The loop has shut down; nobody is reading any more.
+            pass
+
+    def _offer(self, item):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(item)
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class LivePriceHub:
+    def __init__(self, stock_service, interval=None, queue_size=16, max_subscribers=None,
+                 max_async_subscribers=None):
+        env = os.environ.get
+        self.stock_service = stock_service
+        self.interval = interval if interval is not None else float(env("STOCK_LIVE_INTERVAL", 15))
+        self.queue_size = queue_size
+        self.max_subscribers = (
+            max_subscribers if max_subscribers is not None else int(env("STOCK_MAX_STREAMS", 8))
+        )
+        self.max_async_subscribers = (
+            max_async_subscribers if max_async_subscribers is not None
+            else int(env("STOCK_MAX_ASYNC_STREAMS", 1000))
+        )
+        self.subscriber_count = 0
+        self.async_subscriber_count = 0
+        self.rejected = 0
+        self._subscribers = {}
+        self._pollers = {}
+        self._last_quotes = {}
+        self._lock = threading.Lock()
+        self.polls = 0
+
+    def subscribe(self, symbol, loop=None):
+        # With loop, the subscription is a LoopQueue read on that event loop.
+        q = queue.Queue(maxsize=self.queue_size) if loop is None else LoopQueue(loop, self.queue_size)
+        with self._lock:
+            if loop is None:
+                full = self.subscriber_count - self.async_subscriber_count >= self.max_subscribers
+            else:
+                full = self.async_subscriber_count >= self.max_async_subscribers
+            if full:
+                self.rejected += 1
+                return None
+            self.subscriber_count += 1
+            if loop is not None:
+                self.async_subscriber_count += 1
+            self._subscribers.setdefault(symbol, set()).add(q)
+            last = self._last_quotes.get(symbol)
+            if last is not None:
+                q.put_nowait(("price", last))
+            if symbol not in self._pollers:
+                stop = threading.Event()
+                thread = threading.Thread(target=self._poll, args=(symbol, stop), daemon=True, name=f"live-{symbol}")
+                self._pollers[symbol] = (thread, stop)
+                thread.start()
+        return q
+
+    def unsubscribe(self, symbol, q):
+        with self._lock:
+            # Safe to call more than once for the same subscription.
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is None or q not in subscribers:
+                return
+            subscribers.discard(q)
+            self.subscriber_count -= 1
+            if isinstance(q, LoopQueue):
+                self.async_subscriber_count -= 1
+            if not subscribers:
+                del self._subscribers[symbol]
+                self._last_quotes.pop(symbol, None)
+                _, stop = self._pollers.pop(symbol)
+                stop.set()
+
+    def _poll(self, symbol, stop):
+        while not stop.is_set():
+            self.polls += 1
+            try:
+                quote = self.stock_service.get_live_price(symbol)
+            except Exception as e:
+                self._publish(symbol, "error", {"symbol": symbol, "error": str(e)})
+            else:
+                last = self._last_quotes.get(symbol)
+                if last is None or self._changed(last, quote):
+                    self._last_quotes[symbol] = quote
+                    self._publish(symbol, "price", quote)
+            stop.wait(self.interval)
+
+    def _changed(self, old, new):
+        return any(old.get(k) != new.get(k) for k in ("price", "change", "high", "low", "volume"))
+
+    def _publish(self, symbol, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(symbol, ()))
+        for q in subscribers:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                # Slow consumer: drop its oldest event rather than block the poller.
+                try:
+                    q.get_nowait()
+                    q.put_nowait((event, data))
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "symbols": len(self._subscribers),
+                "subscribers": self.subscriber_count,
+                "maxSubscribers": self.max_subscribers,
+                "asyncSubscribers": self.async_subscriber_count,
+                "maxAsyncSubscribers": self.max_async_subscribers,
+                "rejected": self.rejected,
+                "polls": self.polls,
+            }
@@ -1,79 +1,184 @@
 import os
+import asyncio
+import threading
 import numpy as np
 from datetime import datetime, timedelta
-import requests
+from .backends import create_cache, run_backend
+from .http_client import get_client, get_async_client
+from .metrics import stage
+from .singleflight import SingleFlight, AsyncSingleFlight
+from .indicators import latest_indicators
+
+PREDICTION_MODES = ("walk", "montecarlo")
+MAX_MONTE_CARLO_PATHS = 50000
+PERCENTILES = (5, 25, 50, 75, 95)
+SENTIMENT_LABELS = ["bullish", "bearish", "neutral"]
+NEUTRAL_SENTIMENT = 0.5
+
+# ---------------- Local Zero-Shot Model ----------------
+
+# With SENTIMENT_LOCAL_MODEL set (e.g. facebook/bart-large-mnli) sentiment is
+# scored by a transformers pipeline on CPU instead of the hosted API. The
+# pipeline is built on first use and reused for the life of the process, so
+# each gunicorn worker loads the model once.
+_local_pipeline = None
+_local_pipeline_lock = threading.Lock()
+
+
+def _local_classifier(model):
+    global _local_pipeline
+    with _local_pipeline_lock:
+        if _local_pipeline is None:
+            from transformers import pipeline
+            _local_pipeline = pipeline("zero-shot-classification", model=model, device=-1)
+    return _local_pipeline
+
 
 class PredictionService:
     def __init__(self):
         self.api_key = os.environ.get('HUGGINGFACE_API_KEY', '')
-        self.api_url = "https://api-inference.huggingface.co/models/facebook/bart-large-mnli"
+        self.api_url = os.environ.get(
+            'HUGGINGFACE_API_URL', 'https://api-inference.huggingface.co/models/facebook/bart-large-mnli'
+        )
+        self.local_model = os.environ.get('SENTIMENT_LOCAL_MODEL', '')
+        self.cache = create_cache("prediction", ttl=300)
+        # The sentiment input is a fixed template per symbol, so a score
+        # stays valid until the TTL runs out.
+        self.sentiment_cache = create_cache("sentiment", ttl=int(os.environ.get('SENTIMENT_CACHE_TTL', 3600)))
+        self.sentiment_flight = SingleFlight()
+        self.async_sentiment_flight = AsyncSingleFlight()
+        self.http = get_client("huggingface", timeout=(3.05, 10), retries=1)
     
-    def _calculate_technical_indicators(self, prices):
-        prices = np.array(prices)
-        
-        sma_5 = np.mean(prices[-5:]) if len(prices) >= 5 else np.mean(prices)
-        sma_20 = np.mean(prices[-20:]) if len(prices) >= 20 else np.mean(prices)
-        
-        if len(prices) >= 14:
-            deltas = np.diff(prices[-15:])
-            gains = np.where(deltas > 0, deltas, 0)
-            losses = np.where(deltas < 0, -deltas, 0)
-            avg_gain = np.mean(gains)
-            avg_loss = np.mean(losses)
-            rs = avg_gain / avg_loss if avg_loss > 0 else 100
-            rsi = 100 - (100 / (1 + rs))
-        else:
-            rsi = 50
-        
-        if len(prices) >= 2:
-            volatility = np.std(prices[-20:]) / np.mean(prices[-20:]) * 100 if len(prices) >= 20 else np.std(prices) / np.mean(prices) * 100
-        else:
-            volatility = 0
-        
-        momentum = ((prices[-1] - prices[-5]) / prices[-5] * 100) if len(prices) >= 5 else 0
+    # ---------------- Sentiment ----------------
+
+    def _sentiment_text(self, symbol):
+        return f"Stock {symbol} market performance outlook"
+
+    def _sentiment_request(self, symbols):
+        headers = {"Authorization": f"Bearer {self.api_key}"}
         
-        return {
-            "sma_5": round(sma_5, 2),
-            "sma_20": round(sma_20, 2),
-            "rsi": round(rsi, 2),
-            "volatility": round(volatility, 2),
-            "momentum": round(momentum, 2)
+        # A list of inputs is classified in one inference call and answered
+        # with a list of results in the same order.
+        texts = [self._sentiment_text(symbol) for symbol in symbols]
+        payload = {
+            "inputs": texts[0] if len(texts) == 1 else texts,
+            "parameters": {"candidate_labels": SENTIMENT_LABELS}
         }
+        return headers, payload
     
-    def _get_sentiment_score(self, symbol):
+    def _score(self, result):
+        if 'labels' in result and 'scores' in result:
+            labels = result['labels']
+            scores = result['scores']
+            
+            bullish_score = scores[labels.index('bullish')] if 'bullish' in labels else 0
+            bearish_score = scores[labels.index('bearish')] if 'bearish' in labels else 0
+            
+            return (bullish_score - bearish_score + 1) / 2
+        return None
+
+    def _parse_sentiments(self, symbols, results):
+        if isinstance(results, dict):
+            results = [results]
+        if not isinstance(results, list) or len(results) != len(symbols):
+            return {}
+        scores = {}
+        for symbol, result in zip(symbols, results):
+            score = self._score(result) if isinstance(result, dict) else None
+            if score is not None:
+                scores[symbol] = score
+        return scores
+
+    def _classify_local(self, symbols):
+        classifier = _local_classifier(self.local_model)
+        texts = [self._sentiment_text(symbol) for symbol in symbols]
+        with stage("sentiment_model"):
+            results = classifier(texts, candidate_labels=SENTIMENT_LABELS)
+        return self._parse_sentiments(symbols, results)
+
+    def _fetch_sentiments(self, symbols):
+        # Scores for the symbols that could be classified; failures are left
+        # out so they fall back to neutral without being cached.
         try:
+            if self.local_model:
+                return self._classify_local(symbols)
             if not self.api_key:
-                return 0.5
+                return {}
             
-            headers = {"Authorization": f"Bearer {self.api_key}"}
-            
-            text = f"Stock {symbol} market performance outlook"
-            payload = {
-                "inputs": text,
-                "parameters": {"candidate_labels": ["bullish", "bearish", "neutral"]}
-            }
+            headers, payload = self._sentiment_request(symbols)
+            with stage("huggingface"):
+                response = self.http.post(self.api_url, headers=headers, json=payload)
+            if response.status_code != 200:
+                return {}
+            return self._parse_sentiments(symbols, response.json())
+        except Exception:
+            return {}
+
+    async def _fetch_sentiments_async(self, symbols):
+        try:
+            if self.local_model:
+                return await asyncio.to_thread(self._classify_local, symbols)
+            if not self.api_key:
+                return {}
             
-            response = requests.post(self.api_url, headers=headers, json=payload, timeout=10)
-            
-            if response.status_code == 200:
-                result = response.json()
-                if 'labels' in result and 'scores' in result:
-                    labels = result['labels']
-                    scores = result['scores']
-                    
-                    bullish_score = scores[labels.index('bullish')] if 'bullish' in labels else 0
-                    bearish_score = scores[labels.index('bearish')] if 'bearish' in labels else 0
-                    
-                    sentiment = (bullish_score - bearish_score + 1) / 2
-                    return sentiment
-            
-            return 0.5
+            headers, payload = self._sentiment_request(symbols)
+            client = get_async_client("huggingface", timeout=(3.05, 10), retries=1)
+            with stage("huggingface"):
+                response = await client.post(self.api_url, headers=headers, json=payload)
+            if response.status_code != 200:
+                return {}
+            return self._parse_sentiments(symbols, response.json())
         except Exception:
-            return 0.5
+            return {}
+
+    def _cached_sentiments(self, symbols):
+        scores = {}
+        missing = []
+        for symbol in dict.fromkeys(symbols):
+            score = self.sentiment_cache.get(f"sentiment_{symbol}")
+            if score is None:
+                missing.append(symbol)
+            else:
+                scores[symbol] = score
+        return scores, missing
+
+    def _store_sentiments(self, scores, fetched, missing):
+        for symbol in missing:
+            if symbol in fetched:
+                self.sentiment_cache.set(f"sentiment_{symbol}", fetched[symbol])
+            scores[symbol] = fetched.get(symbol, NEUTRAL_SENTIMENT)
+        return scores
+
+    def get_sentiment_scores(self, symbols):
+        # Cached symbols are answered locally; the rest go out in a single
+        # batched inference call. Identical concurrent misses share it.
+        scores, missing = self._cached_sentiments(symbols)
+        if not missing:
+            return scores
+        fetched = self.sentiment_flight.do(
+            "sentiment_" + ",".join(missing), lambda: self._fetch_sentiments(missing)
+        )
+        return self._store_sentiments(scores, fetched, missing)
+
+    async def get_sentiment_scores_async(self, symbols):
+        cache = self.sentiment_cache
+        scores, missing = await run_backend(cache, self._cached_sentiments, symbols)
+        if not missing:
+            return scores
+        fetched = await self.async_sentiment_flight.do(
+            "sentiment_" + ",".join(missing), lambda: self._fetch_sentiments_async(missing)
+        )
+        return await run_backend(cache, self._store_sentiments, scores, fetched, missing)
     
-    def _generate_predictions(self, prices, days, indicators, sentiment):
-        last_price = prices[-1]
-        
+    def _get_sentiment_score(self, symbol):
+        return self.get_sentiment_scores([symbol])[symbol]
+    
+    async def _get_sentiment_score_async(self, symbol):
+        return (await self.get_sentiment_scores_async([symbol]))[symbol]
+    
+    # ---------------- Model ----------------
+
+    def _model_factors(self, indicators, sentiment):
         trend_factor = 1.0
         if indicators['sma_5'] > indicators['sma_20']:
             trend_factor = 1.02
@@ -90,6 +195,13 @@ class PredictionService:
         
         volatility_range = indicators['volatility'] / 100
         
+        combined_factor = (trend_factor * rsi_factor * sentiment_factor)
+        return combined_factor, volatility_range
+    
+    def _generate_predictions(self, prices, days, indicators, sentiment):
+        last_price = float(prices[-1])
+        combined_factor, volatility_range = self._model_factors(indicators, sentiment)
+        
         predictions = []
         current_price = last_price
         
@@ -99,7 +211,6 @@ class PredictionService:
             if date.weekday() >= 5:
                 continue
             
-            combined_factor = (trend_factor * rsi_factor * sentiment_factor)
             daily_change = (combined_factor - 1) + np.random.normal(0, volatility_range * 0.3)
             
             predicted_price = current_price * (1 + daily_change)
@@ -121,21 +232,137 @@ class PredictionService:
         
         return predictions[:days]
     
-    def predict(self, symbol, stock_data, days=7):
+    def _forecast_dates(self, last_date, days):
+        start = last_date.astype(datetime)
+        dates = [start + timedelta(days=i + 1) for i in range(days)]
+        return [d for d in dates if d.weekday() < 5]
+
+    def _generate_monte_carlo_predictions(self, prices, last_date, days, indicators, sentiment, paths, seed):
+        # Same drift and daily noise as the single-path walk, simulated for
+        # all paths at once. A seeded generator keeps the result deterministic
+        # for a given (symbol, last bar, days, paths, seed).
+        last_price = float(prices[-1])
+        dates = self._forecast_dates(last_date, days)
+        if not dates:
+            return []
+
+        combined_factor, volatility_range = self._model_factors(indicators, sentiment)
+        drift = combined_factor - 1
+
+        rng = np.random.default_rng(seed)
+        shocks = rng.normal(drift, volatility_range * 0.3, size=(paths, len(dates)))
+        simulated = last_price * np.cumprod(1 + shocks, axis=1)
+        bands = np.percentile(simulated, PERCENTILES, axis=0)
+
+        predictions = []
+        for i, date in enumerate(dates):
+            p5, p25, p50, p75, p95 = bands[:, i].tolist()
+            predictions.append({
+                "date": date.strftime('%Y-%m-%d'),
+                "predictedPrice": round(p50, 2),
+                "lowBound": round(p5, 2),
+                "highBound": round(p95, 2),
+                "percentiles": {
+                    "p5": round(p5, 2),
+                    "p25": round(p25, 2),
+                    "p50": round(p50, 2),
+                    "p75": round(p75, 2),
+                    "p95": round(p95, 2)
+                },
+                "probabilityAboveCurrent": round(float((simulated[:, i] > last_price).mean()), 4),
+                "confidence": round(max(0.5, min(0.95, 1 - (p95 - p5) / p50)), 2)
+            })
+        return predictions
+
+    def _cache_key(self, symbol, history, days, mode, paths, seed):
+        # The fingerprint covers the newest bar's values, which change while
+        # its session is still open; the date alone would not.
+        cache_key = f"prediction_{symbol}_{history.fingerprint()}_{days}_{mode}"
+        if mode == "montecarlo":
+            cache_key += f"_{paths}_{seed}"
+        return cache_key
+
+    def _cached_prediction(self, symbol, stock_data, days, mode, paths, seed):
+        history = stock_data['history']
+        if len(history) < 5:
+            return None
+        return self.cache.get(self._cache_key(symbol, history, days, mode, paths, seed))
+
+    async def predict_async(self, symbol, stock_data, days=7, indicators=None, mode="walk", paths=10000, seed=0):
+        # ASGI mode: the sentiment call is awaited and the model runs on a
+        # worker thread; cached predictions return without either.
+        cached = await run_backend(
+            self.cache, self._cached_prediction, symbol, stock_data, days, mode, paths, seed
+        )
+        if cached is not None:
+            return cached
+        sentiment = await self._get_sentiment_score_async(symbol)
+        return await asyncio.to_thread(
+            self.predict, symbol, stock_data, days, indicators, mode, paths, seed, sentiment
+        )
+
+    def _uncached(self, stocks, days, mode, paths, seed):
+        return [
+            symbol for symbol, stock_data in stocks.items()
+            if self._cached_prediction(symbol, stock_data, days, mode, paths, seed) is None
+        ]
+
+    def predict_many(self, stocks, days=7, indicators=None, mode="walk", paths=10000, seed=0, sentiments=None):
+        # stocks maps symbol -> stock data and indicators (optional) symbol ->
+        # latest indicators. Sentiment for every symbol without a cached
+        # prediction is scored in one batched inference call.
+        indicators = indicators or {}
+        if sentiments is None:
+            pending = self._uncached(stocks, days, mode, paths, seed)
+            sentiments = self.get_sentiment_scores(pending) if pending else {}
+
+        results = {}
+        errors = {}
+        for symbol, stock_data in stocks.items():
+            try:
+                results[symbol] = self.predict(
+                    symbol, stock_data, days, indicators.get(symbol), mode, paths, seed, sentiments.get(symbol)
+                )
+            except Exception as e:
+                errors[symbol] = {"error": "Prediction failed", "details": str(e), "status": 503}
+        return results, errors
+
+    async def predict_many_async(self, stocks, days=7, indicators=None, mode="walk", paths=10000, seed=0):
+        pending = await run_backend(self.cache, self._uncached, stocks, days, mode, paths, seed)
+        sentiments = await self.get_sentiment_scores_async(pending) if pending else {}
+        return await asyncio.to_thread(
+            self.predict_many, stocks, days, indicators, mode, paths, seed, sentiments
+        )
+
+    def predict(self, symbol, stock_data, days=7, indicators=None, mode="walk", paths=10000, seed=0, sentiment=None):
         try:
-            prices = [item['close'] for item in stock_data['history']]
+            history = stock_data['history']
+            prices = history.close
             
             if len(prices) < 5:
                 raise Exception("Insufficient historical data for prediction")
             
-            indicators = self._calculate_technical_indicators(prices)
-            sentiment = self._get_sentiment_score(symbol)
-            predictions = self._generate_predictions(prices, days, indicators, sentiment)
+            cache_key = self._cache_key(symbol, history, days, mode, paths, seed)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            if indicators is None:
+                indicators = latest_indicators(prices)
+            if sentiment is None:
+                sentiment = self._get_sentiment_score(symbol)
+            with stage("prediction_model"):
+                if mode == "montecarlo":
+                    predictions = self._generate_monte_carlo_predictions(
+                        prices, history.date[-1], days, indicators, sentiment, paths, seed
+                    )
+                else:
+                    predictions = self._generate_predictions(prices, days, indicators, sentiment)
             
             if predictions:
                 first_pred = predictions[0]['predictedPrice']
                 last_pred = predictions[-1]['predictedPrice']
-                overall_change = ((last_pred - prices[-1]) / prices[-1]) * 100
+                overall_change = ((last_pred - float(prices[-1])) / float(prices[-1])) * 100
             else:
                 overall_change = 0
             
@@ -149,7 +376,7 @@ class PredictionService:
                 recommendation = "HOLD"
                 recommendation_detail = "Market conditions appear stable. Consider holding current positions."
             
-            return {
+            result = {
                 "symbol": symbol,
                 "currentPrice": stock_data['currentPrice'],
                 "predictions": predictions,
@@ -158,7 +385,12 @@ class PredictionService:
                 "overallChange": round(overall_change, 2),
                 "recommendation": recommendation,
                 "recommendationDetail": recommendation_detail,
+                "mode": mode,
                 "generatedAt": datetime.now().isoformat()
             }
+            if mode == "montecarlo":
+                result.update({"paths": paths, "seed": seed})
+            self.cache.set(cache_key, result)
+            return result
         except Exception as e:
             raise Exception(f"Prediction error: {str(e)}")
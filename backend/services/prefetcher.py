@@ -0,0 +1,191 @@
+import os
+import time
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from .stock_service import RateLimitException, NoDataException
+
+# ---------------- Prefetcher ----------------
+
+# Keeps popular and frequently requested histories warm so user requests
+# rarely wait on Stooq. Every interval seconds the scheduler queues symbols
+# that are cold, within `lead` seconds of their TTL, or were fetched before
+# their exchange's most recent close, then works through the queue within
+# a per-minute fetch budget. Anything left over waits for the next run.
+
+MARKET_CLOSES = {
+    "NSE": ("Asia/Kolkata", 15, 30),
+    "BSE": ("Asia/Kolkata", 15, 30),
+    "US": ("America/New_York", 16, 0),
+}
+
+
+def market_for(symbol):
+    if symbol.endswith(".NS"):
+        return "NSE"
+    if symbol.endswith(".BO"):
+        return "BSE"
+    return "US"
+
+
+def last_close(market, now=None, delay=0):
+    # Most recent weekday close (plus delay seconds for end-of-day data to
+    # land upstream) at or before now, as a UTC timestamp. Exchange holidays
+    # are not modelled; they only cost one extra refresh.
+    tz_name, hour, minute = MARKET_CLOSES[market]
+    tz = ZoneInfo(tz_name)
+    now = datetime.fromtimestamp(now if now is not None else time.time(), tz)
+    close = now.replace(hour=hour, minute=minute, second=0, microsecond=0) + timedelta(seconds=delay)
+    while close > now or close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close.timestamp()
+
+
+class Prefetcher:
+    def __init__(self, stock_service, interval=None, top_n=None, budget=None, lead=None, close_delay=None):
+        env = os.environ.get
+        self.stock_service = stock_service
+        self.interval = interval if interval is not None else float(env("STOCK_PREFETCH_INTERVAL", 30))
+        self.top_n = top_n if top_n is not None else int(env("STOCK_PREFETCH_TOP", 20))
+        self.budget = budget if budget is not None else int(env("STOCK_PREFETCH_PER_MINUTE", 30))
+        self.lead = lead if lead is not None else float(env("STOCK_PREFETCH_LEAD", 60))
+        self.close_delay = close_delay if close_delay is not None else float(env("STOCK_PREFETCH_CLOSE_DELAY", 900))
+
+        self.queue = deque()
+        self.current = None
+        self.fetched = 0
+        self.failed = 0
+        self.deferred = 0
+        self.last_run = None
+        self.next_run = None
+        self._calls = deque()
+        self._decayed_at = time.time()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, daemon=True, name="prefetcher")
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _decay(self):
+        # Halve request counts once a day so "most requested" follows what
+        # users look at now rather than all-time totals.
+        if time.time() - self._decayed_at < 86400:
+            return
+        self._decayed_at = time.time()
+        with self.stock_service._requested_lock:
+            requested = self.stock_service.requested
+            for symbol in list(requested):
+                requested[symbol] //= 2
+                if not requested[symbol]:
+                    del requested[symbol]
+
+    def symbols(self):
+        # Popular symbols first, then the most requested ones.
+        popular = [s["symbol"] for s in self.stock_service.popular_stocks]
+        with self.stock_service._requested_lock:
+            top = [symbol for symbol, _ in self.stock_service.requested.most_common(self.top_n)]
+        return list(dict.fromkeys(popular + top))
+
+    def _due(self, symbol, now):
+        # (sort key, max_age) for symbols that need a fetch, None otherwise.
+        # Cold symbols go first, then the oldest entries; max_age is what
+        # makes the refresh skip an entry that is already recent enough.
+        age = self.stock_service.bars_age(symbol)
+        if age is None:
+            return (0, 0), 0
+        since_close = now - last_close(market_for(symbol), now, self.close_delay)
+        if age >= since_close:
+            return (1, -age), since_close
+        max_age = max(0, self.stock_service.cache_ttl - self.lead)
+        if age >= max_age:
+            return (1, -age), max_age
+        return None
+
+    def plan(self):
+        now = time.time()
+        due = []
+        for symbol in self.symbols():
+            entry = self._due(symbol, now)
+            if entry is not None:
+                due.append((entry[0], symbol, entry[1]))
+        due.sort()
+        with self._lock:
+            self.queue = deque((symbol, max_age) for _, symbol, max_age in due)
+        return [symbol for symbol, _ in self.queue]
+
+    def take_budget(self):
+        # One upstream fetch from the per-minute budget; False when spent.
+        # The screener's background refreshes draw on it too.
+        now = time.time()
+        with self._lock:
+            while self._calls and now - self._calls[0] >= 60:
+                self._calls.popleft()
+            if len(self._calls) >= self.budget:
+                return False
+            self._calls.append(now)
+            return True
+
+    def run_once(self):
+        self._decay()
+        self.plan()
+        while not self._stop.is_set():
+            with self._lock:
+                if not self.queue:
+                    break
+                symbol, max_age = self.queue[0]
+            if not self.take_budget():
+                with self._lock:
+                    self.deferred += len(self.queue)
+                break
+            with self._lock:
+                self.queue.popleft()
+                self.current = symbol
+            try:
+                self.stock_service.refresh_bars(symbol, max_age=max_age)
+                self.fetched += 1
+            except (NoDataException, ValueError):
+                # No bars or not a valid symbol: stop re-queueing it.
+                self.stock_service.forget_request(symbol)
+                self.failed += 1
+            except Exception:
+                # Rate limits, open circuit, timeouts and 5xx responses are
+                # transient; the symbol is kept for the next run.
+                self.deferred += 1
+            finally:
+                self.current = None
+        self.last_run = time.time()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                pass
+            self.next_run = time.time() + self.interval
+            self._stop.wait(self.interval)
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "queue": [symbol for symbol, _ in self.queue],
+                "current": self.current,
+                "fetched": self.fetched,
+                "failed": self.failed,
+                "deferred": self.deferred,
+                "budgetPerMinute": self.budget,
+                "budgetUsed": sum(1 for t in self._calls if now - t < 60),
+                "lastRun": self.last_run,
+                "nextRun": self.next_run,
+            }
@@ -0,0 +1,150 @@
+import os
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from .indicators import wilder_rsi, momentum, rolling_volatility, return_stats, sma
+
+SCREENER_FIELDS = ("rsi", "momentum", "volatility", "winRate", "averageDailyReturn", "changePercent")
+MIN_SCREENER_BARS = 21
+COLUMNS = ("price", "changePercent", "rsi", "momentum", "volatility", "sma5", "sma20", "winRate", "averageDailyReturn")
+
+# ---------------- Screener Service ----------------
+
+# Ranks a universe of symbols using only histories that are already cached
+# or stored on disk. Closes are stacked into one (symbols x bars) matrix and
+# every indicator is computed for all symbols in a single vectorized pass
+# (one pass per history length when some symbols have fewer than lookback
+# bars). Missing or stale histories are refreshed in the background within
+# the prefetcher's per-minute budget, without counting as user requests,
+# and show up in later calls.
+
+class ScreenerService:
+    def __init__(self, stock_service, prefetcher):
+        self.stock_service = stock_service
+        self.prefetcher = prefetcher
+        self.lookback = int(os.environ.get("SCREENER_LOOKBACK", 60))
+        self.universe_file = os.environ.get("SCREENER_UNIVERSE_FILE", "")
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("SCREENER_REFRESH_WORKERS", 4)),
+            thread_name_prefix="screener"
+        )
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._universe = None
+
+    def universe(self):
+        if self._universe is None:
+            symbols = [s["symbol"] for s in self.stock_service.popular_stocks]
+            if self.universe_file and os.path.exists(self.universe_file):
+                with open(self.universe_file) as f:
+                    for line in f:
+                        line = line.split("#", 1)[0].strip()
+                        if line:
+                            symbols.append(line.split(",", 1)[0].strip().upper())
+            self._universe = list(dict.fromkeys(symbols))
+        return self._universe
+
+    def _refresh_in_background(self, symbol):
+        with self._lock:
+            if symbol in self._refreshing:
+                return
+            if not self.prefetcher.take_budget():
+                # Out of budget: the symbol stays pending until a later call.
+                return
+            self._refreshing.add(symbol)
+
+        def refresh():
+            try:
+                self.stock_service.refresh_bars(symbol)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(symbol)
+
+        self.executor.submit(refresh)
+
+    def _columns(self, histories):
+        # Histories with at least lookback + 1 bars share one matrix; a
+        # shorter (newly listed) one is ranked over the bars it has, in a
+        # matrix of its own length, so it cannot shorten everyone's window.
+        full = self.lookback + 1
+        groups = {}
+        for i, bars in enumerate(histories):
+            groups.setdefault(min(full, len(bars)), []).append(i)
+
+        columns = {name: np.empty(len(histories)) for name in COLUMNS}
+        for length, rows in groups.items():
+            closes = np.stack([histories[i].close[-length:] for i in rows])
+            stats = return_stats(closes)
+            values = {
+                "price": closes[:, -1],
+                "changePercent": (closes[:, -1] - closes[:, -2]) / closes[:, -2] * 100,
+                "rsi": wilder_rsi(closes, 14)[:, -1],
+                "momentum": momentum(closes, 5)[:, -1],
+                "volatility": rolling_volatility(closes, 20)[:, -1],
+                "sma5": sma(closes, 5)[:, -1],
+                "sma20": sma(closes, 20)[:, -1],
+                "winRate": stats["winRate"],
+                "averageDailyReturn": stats["averageDailyReturn"],
+            }
+            for name in COLUMNS:
+                columns[name][rows] = values[name]
+        return columns
+
+    def screen(self, symbols=None, sort="rsi", order="desc", filters=None, limit=50):
+        symbols = symbols or self.universe()
+        filters = filters or {}
+
+        ready = []
+        histories = []
+        pending = []
+        insufficient = []
+        invalid = []
+        for symbol in symbols:
+            try:
+                bars, fresh = self.stock_service.peek_bars(symbol)
+            except ValueError:
+                # Not a valid symbol for the history store; never fetched.
+                invalid.append(symbol)
+                continue
+            if not fresh:
+                self._refresh_in_background(symbol)
+            if bars is None:
+                pending.append(symbol)
+            elif len(bars) < MIN_SCREENER_BARS:
+                insufficient.append(symbol)
+            else:
+                ready.append(symbol)
+                histories.append(bars)
+
+        results = []
+        if ready:
+            columns = self._columns(histories)
+
+            keep = np.ones(len(ready), dtype=bool)
+            for (field, bound), value in filters.items():
+                with np.errstate(invalid="ignore"):
+                    keep &= columns[field] >= value if bound == "min" else columns[field] <= value
+
+            ranked = np.argsort(columns[sort], kind="stable")
+            if order == "desc":
+                ranked = ranked[::-1]
+            ranked = [i for i in ranked if keep[i]][:limit]
+
+            rounded = {name: np.round(values, 2).tolist() for name, values in columns.items()}
+            for i in ranked:
+                row = {"symbol": ready[i], "lastDate": str(histories[i].date[-1])}
+                row.update({name: values[i] for name, values in rounded.items()})
+                results.append(row)
+
+        return {
+            "results": results,
+            "sort": sort,
+            "order": order,
+            "lookback": self.lookback,
+            "universeSize": len(symbols),
+            "pending": pending,
+            "insufficientData": insufficient,
+            "invalid": invalid
+        }
@@ -1,58 +1,79 @@
-import pandas as pd
-from datetime import datetime
+import os
+import copy
+import asyncio
 import time
-import requests
+import threading
+from collections import Counter
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from io import StringIO
+from .history_store import HistoryStore, BAR_DTYPE, empty_bars
+from .bars import Bars
+from .backends import create_cache, run_backend
+from .singleflight import SingleFlight, AsyncSingleFlight
+from .http_client import get_client, get_async_client, RateLimitException
+from .metrics import stage
+from .indicators import compute_indicators, IndicatorState
+from .instruments import InstrumentIndex, load_instruments
 
 # ---------------- Exceptions ----------------
 
-class RateLimitException(Exception):
+class NoDataException(Exception):
+    # Stooq answered but has no bars for the symbol (unknown or delisted),
+    # as opposed to an upstream error worth retrying.
     pass
 
-# ---------------- Rate Limiter ----------------
-
-class SimpleRateLimiter:
-    def __init__(self, max_calls=5, window=60):
-        self.max_calls = max_calls
-        self.window = window
-        self.calls = {}
-
-    def allow(self, key):
-        now = time.time()
-        timestamps = self.calls.get(key, [])
-        timestamps = [t for t in timestamps if now - t < self.window]
-
-        if len(timestamps) >= self.max_calls:
-            return False
-
-        timestamps.append(now)
-        self.calls[key] = timestamps
-        return True
-
-# ---------------- Cache ----------------
-
-class SimpleCache:
-    def __init__(self, ttl=300):
-        self.cache = {}
-        self.ttl = ttl
-
-    def get(self, key):
-        if key in self.cache:
-            value, ts = self.cache[key]
-            if time.time() - ts < self.ttl:
-                return value
-            del self.cache[key]
-        return None
-
-    def set(self, key, value):
-        self.cache[key] = (value, time.time())
+# ---------------- Periods ----------------
+
+# Calendar lookback for each supported `period`; None means the full history.
+PERIODS = {
+    "5d": np.timedelta64(7, "D"),
+    "1mo": np.timedelta64(31, "D"),
+    "3mo": np.timedelta64(92, "D"),
+    "6mo": np.timedelta64(183, "D"),
+    "1y": np.timedelta64(365, "D"),
+    "2y": np.timedelta64(730, "D"),
+    "5y": np.timedelta64(1826, "D"),
+    "max": None,
+}
+
+def slice_period(bars, period):
+    lookback = PERIODS[period]
+    if lookback is None or not len(bars):
+        return bars
+    start = bars.date[-1] - lookback
+    return bars[np.searchsorted(bars.date, start, side="right"):]
 
 # ---------------- Stock Service ----------------
 
 class StockService:
     def __init__(self):
-        self.rate_limiter = SimpleRateLimiter()
-        self.cache = SimpleCache()
+        self.stooq_base_url = os.environ.get("STOOQ_BASE_URL", "https://stooq.com").rstrip("/")
+        self.cache_ttl = int(os.environ.get("STOCK_CACHE_TTL", 300))
+        self.live_ttl = int(os.environ.get("STOCK_LIVE_TTL", 15))
+        self.stale_ttl = int(os.environ.get("STOCK_STALE_TTL", 300))
+        self.cache = create_cache("stock", ttl=self.cache_ttl)
+        self.history_store = HistoryStore()
+        self.single_flight = SingleFlight()
+        # Request counts per symbol, read by the prefetcher to pick what to
+        # keep warm.
+        self.requested = Counter()
+        self._requested_lock = threading.Lock()
+
+        self.indicator_states = {}
+        self._indicator_lock = threading.Lock()
+        self.refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="stock-refresh")
+
+        # Batch requests fan out over a bounded pool that shares one
+        # keep-alive connection pool to Stooq.
+        self.batch_workers = int(os.environ.get("STOCK_BATCH_WORKERS", 8))
+        self.batch_executor = ThreadPoolExecutor(max_workers=self.batch_workers, thread_name_prefix="stock-batch")
+        self.http = get_client("stooq", pool_maxsize=self.batch_workers + 2)
+
+        # Used only by the async serving mode (asgi_app.py).
+        self.async_flight = AsyncSingleFlight()
+        self.async_max_connections = int(os.environ.get("STOCK_ASYNC_MAX_CONNECTIONS", 100))
 
         self.popular_stocks = [
             {"symbol": "AAPL", "name": "Apple Inc.", "exchange": "NASDAQ"},
@@ -65,6 +86,10 @@ class StockService:
             {"symbol": "HDFCBANK.NS", "name": "HDFC Bank", "exchange": "NSE"},
         ]
 
+        # Search and exchange listings run against the instrument master
+        # (STOCK_INSTRUMENTS_FILE), indexed once here.
+        self.instruments = InstrumentIndex(self.popular_stocks + load_instruments())
+
     # ---------- Utilities ----------
 
     def _convert_to_stooq_symbol(self, symbol):
@@ -74,42 +99,69 @@ class StockService:
 
     # ---------- Search ----------
 
-    def search_stocks(self, query):
-        query = query.upper()
-        return [
-            s for s in self.popular_stocks
-            if query in s["symbol"].upper() or query in s["name"].upper()
-        ][:10]
+    def search_stocks(self, query, exchange=None):
+        return self.instruments.search(query, limit=10, exchange=exchange)
 
     # ---------- Stooq Fetch ----------
 
-    def fetch_from_stooq(self, symbol):
+    def _stooq_url(self, symbol, since=None):
         stooq_symbol = self._convert_to_stooq_symbol(symbol)
-        url = f"https://stooq.com/q/d/l/?s={stooq_symbol}&i=d"
-
-        r = requests.get(url, timeout=10)
+        url = f"{self.stooq_base_url}/q/d/l/?s={stooq_symbol}&i=d"
+        if since is not None:
+            d1 = since.astype(datetime).strftime("%Y%m%d")
+            d2 = (datetime.utcnow() + timedelta(days=1)).strftime("%Y%m%d")
+            url += f"&d1={d1}&d2={d2}"
+        return url
+
+    def _parse_stooq_response(self, r):
         if r.status_code != 200:
             raise Exception("Stooq unavailable")
 
-        df = pd.read_csv(StringIO(r.text))
-        if df.empty:
-            raise Exception("No data from Stooq")
-
-        df = df.tail(30)
-
-        history = []
-        for _, row in df.iterrows():
-            history.append({
-                "date": row["Date"],
-                "open": round(float(row["Open"]), 2),
-                "high": round(float(row["High"]), 2),
-                "low": round(float(row["Low"]), 2),
-                "close": round(float(row["Close"]), 2),
-                "volume": int(row["Volume"]) if not pd.isna(row["Volume"]) else 0
-            })
-
-        current = history[-1]["close"]
-        prev = history[-2]["close"] if len(history) > 1 else current
+        with stage("csv_parse"):
+            return self._parse_stooq_csv(r.text)
+
+    def _download_stooq_bars(self, symbol, since=None):
+        url = self._stooq_url(symbol, since)
+        with stage("stooq_download"):
+            r = self.http.get(url)
+        return self._parse_stooq_response(r)
+
+    def preload(self):
+        # gunicorn preload: import the CSV parser in the master so workers
+        # share it instead of each importing it on their first download.
+        import pandas
+
+    def _parse_stooq_csv(self, text):
+        # pandas is imported on first use; it is the slowest import in the app.
+        import pandas as pd
+        df = pd.read_csv(StringIO(text))
+        if df.empty or "Close" not in df.columns:
+            return empty_bars()
+
+        bars = np.empty(len(df), dtype=BAR_DTYPE)
+        bars["date"] = pd.to_datetime(df["Date"]).to_numpy().astype("datetime64[D]")
+        bars["open"] = df["Open"].astype(float)
+        bars["high"] = df["High"].astype(float)
+        bars["low"] = df["Low"].astype(float)
+        bars["close"] = df["Close"].astype(float)
+        bars["volume"] = df["Volume"].fillna(0).astype("int64") if "Volume" in df.columns else 0
+        return bars
+
+    def refresh_history(self, symbol):
+        # Re-request from the last settled bar (inclusive) so that a partial
+        # bar for the current session is replaced once the session closes.
+        # If the settled bar's close has changed, Stooq has back-adjusted the
+        # history (split or dividend) and the full history is downloaded again.
+        key = self._convert_to_stooq_symbol(symbol)
+        since = self.history_store.resume_date(key)
+        bars = self._download_stooq_bars(symbol, since)
+        if since is not None and self.history_store.revised(key, bars):
+            return self.history_store.replace(key, self._download_stooq_bars(symbol))
+        return self.history_store.merge(key, bars)
+
+    def _build_payload(self, symbol, history):
+        current = float(history.close[-1])
+        prev = float(history.close[-2]) if len(history) > 1 else current
         change = current - prev
         change_pct = (change / prev * 100) if prev else 0
 
@@ -130,28 +182,296 @@ class StockService:
 
     # ---------- Public APIs ----------
 
+    def peek_bars(self, symbol):
+        # Cached or on-disk history without going upstream. Returns
+        # (bars, fresh) or (None, False) when nothing is stored yet.
+        cached = self.cache.get(f"bars_{symbol}")
+        if cached is not None:
+            bars, fetched_at = cached
+            return bars, time.time() - fetched_at < self.cache_ttl
+
+        stored = self.history_store.load(self._convert_to_stooq_symbol(symbol))
+        if len(stored):
+            return Bars.from_structured(stored), False
+        return None, False
+
+    def get_bars(self, symbol):
+        # One cached array per symbol backs every period window. Entries are
+        # fresh for cache_ttl seconds; during the following stale_ttl seconds
+        # the old bars are served while one background refresh runs.
+        # Only symbols that returned data count towards "most requested", so
+        # typos and invalid symbols never reach the prefetcher.
+        cache_key = f"bars_{symbol}"
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            bars, fetched_at = cached
+            if time.time() - fetched_at >= self.cache_ttl:
+                self._refresh_in_background(symbol, cache_key)
+        else:
+            bars = self.single_flight.do(cache_key, lambda: self._fill_bars(symbol, cache_key))
+        self._note_request(symbol)
+        return bars
+
+    def _note_request(self, symbol):
+        with self._requested_lock:
+            self.requested[symbol] += 1
+
+    def forget_request(self, symbol):
+        # Drop a symbol Stooq has no data for; it returns with its next
+        # successful request.
+        with self._requested_lock:
+            self.requested.pop(symbol, None)
+
+    def bars_age(self, symbol):
+        # Seconds since the cached history was fetched, or None when cold.
+        cached = self.cache.get(f"bars_{symbol}")
+        return None if cached is None else time.time() - cached[1]
+
+    def refresh_bars(self, symbol, max_age=None):
+        # Fetch unless the cached history is younger than max_age seconds.
+        cache_key = f"bars_{symbol}"
+        return self.single_flight.do(cache_key, lambda: self._fill_bars(symbol, cache_key, max_age))
+
+    def _fill_bars(self, symbol, cache_key, max_age=None):
+        # With a shared backend, the lock makes sure only one worker goes
+        # upstream for this key; the others pick up its result.
+        max_age = self.cache_ttl if max_age is None else max_age
+        with self.cache.lock(cache_key):
+            cached = self.cache.get(cache_key)
+            if cached is not None and time.time() - cached[1] < max_age:
+                return cached[0]
+
+            bars = self.refresh_history(symbol)
+            if not len(bars):
+                raise NoDataException("No data from Stooq")
+
+            bars = Bars.from_structured(bars)
+            self.cache.set(cache_key, (bars, time.time()), ttl=self.cache_ttl + self.stale_ttl)
+            return bars
+
+    def _refresh_in_background(self, symbol, cache_key):
+        if self.single_flight.in_flight(cache_key):
+            return
+
+        def refresh():
+            try:
+                self.single_flight.do(cache_key, lambda: self._fill_bars(symbol, cache_key))
+            except Exception:
+                # Keep serving the stale value; the next request retries.
+                pass
+
+        self.refresh_executor.submit(refresh)
+
     def get_stock_data(self, symbol, period="1mo"):
-        cache_key = f"stock_{symbol}_{period}"
+        if period not in PERIODS:
+            raise ValueError(f"Unsupported period: {period}")
+        return self._build_payload(symbol, slice_period(self.get_bars(symbol), period))
+
+    def get_indicators(self, symbol, period="3mo"):
+        if period not in PERIODS:
+            raise ValueError(f"Unsupported period: {period}")
+
+        # Series are computed over the full stored history so that EMA and
+        # RSI are warmed up, then cut down to the requested window.
+        bars = self.get_bars(symbol)
+        cache_key = f"indicators_{symbol}_{bars.fingerprint()}"
+        series = self.cache.get(cache_key)
+        if series is None:
+            with stage("indicators"):
+                series = compute_indicators(bars)
+            self.cache.set(cache_key, series)
+
+        window = len(slice_period(bars, period))
+        return {
+            "symbol": symbol,
+            "period": period,
+            "dates": np.datetime_as_string(bars.date[-window:], unit="D").tolist(),
+            "indicators": {
+                name: np.where(np.isnan(values[-window:]), None, np.round(values[-window:], 4)).tolist()
+                for name, values in series.items()
+            },
+            "latest": self.get_indicator_state(symbol).latest()
+        }
+
+    def get_indicator_state(self, symbol):
+        # The per-symbol state has absorbed every bar except the newest, which
+        # may still be a partial session bar. New bars are folded in as they
+        # arrive, and the newest bar is applied to a copy on each read.
+        bars = self.get_bars(symbol)
+        committed = len(bars) - 1
+
+        with self._indicator_lock:
+            state = self.indicator_states.get(symbol)
+            if state is not None and state.last_date is not None:
+                consumed = int(np.searchsorted(bars.date, state.last_date, side="right"))
+                # A changed close means the history was back-adjusted and
+                # replaced; the state is rebuilt from the new bars.
+                if (consumed != state.count or consumed > committed
+                        or float(bars.close[consumed - 1]) != state.prev_close):
+                    state = None
+            if state is None:
+                state = IndicatorState()
+                self.indicator_states[symbol] = state
+            if state.count < committed:
+                state.update_bars(bars[state.count:committed])
+            view = copy.deepcopy(state)
+
+        view.update(bars.date[-1], float(bars.high[-1]), float(bars.low[-1]), float(bars.close[-1]))
+        return view
+
+    def get_many(self, symbols, period="1mo"):
+        if period not in PERIODS:
+            raise ValueError(f"Unsupported period: {period}")
+
+        futures = {
+            symbol: self.batch_executor.submit(self.get_stock_data, symbol, period)
+            for symbol in symbols
+        }
+
+        results = {}
+        errors = {}
+        for symbol, future in futures.items():
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                errors[symbol] = self._batch_error(e)
+        return results, errors
+
+    def _batch_error(self, e):
+        if isinstance(e, RateLimitException):
+            return {"error": "Rate limit exceeded", "details": str(e), "status": 429, "retryAfter": e.retry_seconds}
+        if isinstance(e, ValueError):
+            return {"error": "Invalid symbol", "details": str(e), "status": 400}
+        return {"error": "External data provider unavailable", "details": str(e), "status": 503}
+
+    def get_live_price(self, symbol):
+        # Live quotes are cached for live_ttl seconds and coalesced, so any
+        # number of pollers or stream subscribers cost one download per symbol.
+        cache_key = f"live_{symbol}"
         cached = self.cache.get(cache_key)
-        if cached:
+        if cached is not None:
             return cached
+        return self.single_flight.do(cache_key, lambda: self._fetch_live_price(symbol, cache_key))
 
-        if not self.rate_limiter.allow(symbol):
-            raise RateLimitException("Rate limit exceeded")
+    def _fetch_live_price(self, symbol, cache_key):
+        quote = self._quote(symbol, self.refresh_history(symbol))
+        self.cache.set(cache_key, quote, ttl=self.live_ttl)
+        return quote
 
-        data = self.fetch_from_stooq(symbol)
-        self.cache.set(cache_key, data)
-        return data
+    def _quote(self, symbol, bars):
+        if not len(bars):
+            raise NoDataException("No data from Stooq")
 
-    def get_live_price(self, symbol):
-        data = self.fetch_from_stooq(symbol)
+        last = bars[-1]
+        data = self._build_payload(symbol, Bars.from_structured(bars[-2:]))
         return {
             "symbol": symbol,
             "price": data["currentPrice"],
             "change": data["change"],
             "changePercent": data["changePercent"],
+            "open": round(float(last["open"]), 2),
+            "high": round(float(last["high"]), 2),
+            "low": round(float(last["low"]), 2),
+            "volume": int(last["volume"]),
+            "currency": data["currency"],
             "timestamp": datetime.utcnow().isoformat()
         }
 
     def get_nse_stocks(self):
-        return [s for s in self.popular_stocks if s["exchange"] == "NSE"]
+        return self.instruments.exchange("NSE")
+
+    # ---------- Async ----------
+
+    # Coroutine versions of the upstream-bound paths for the ASGI mode. They
+    # use the same cache, history store and rate limiter as the sync methods;
+    # only the Stooq download is awaited, while parsing, the disk merge and
+    # the shared-cache lease run on worker threads.
+
+    @property
+    def async_http(self):
+        return get_async_client("stooq", max_connections=self.async_max_connections)
+
+    async def refresh_history_async(self, symbol):
+        key = self._convert_to_stooq_symbol(symbol)
+        since = await asyncio.to_thread(self.history_store.resume_date, key)
+        with stage("stooq_download"):
+            r = await self.async_http.get(self._stooq_url(symbol, since))
+        bars = await asyncio.to_thread(self._parse_stooq_response, r)
+        if since is not None and await asyncio.to_thread(self.history_store.revised, key, bars):
+            with stage("stooq_download"):
+                r = await self.async_http.get(self._stooq_url(symbol))
+            return await asyncio.to_thread(
+                lambda: self.history_store.replace(key, self._parse_stooq_response(r))
+            )
+        return await asyncio.to_thread(self.history_store.merge, key, bars)
+
+    async def get_bars_async(self, symbol):
+        cache_key = f"bars_{symbol}"
+        cached = await run_backend(self.cache, self.cache.get, cache_key)
+        if cached is not None:
+            bars, fetched_at = cached
+            if time.time() - fetched_at >= self.cache_ttl:
+                self._refresh_in_background(symbol, cache_key)
+        else:
+            bars = await self.async_flight.do(cache_key, lambda: self._fill_bars_async(symbol, cache_key))
+        self._note_request(symbol)
+        return bars
+
+    async def _fill_bars_async(self, symbol, cache_key):
+        # Cache calls go through run_backend: with the SQLite backend they
+        # wait on write locks and unpickle, which must not stall the loop.
+        lock = self.cache.lock(cache_key)
+        await run_backend(self.cache, lock.__enter__)
+        try:
+            cached = await run_backend(self.cache, self.cache.get, cache_key)
+            if cached is not None and time.time() - cached[1] < self.cache_ttl:
+                return cached[0]
+
+            bars = await self.refresh_history_async(symbol)
+            if not len(bars):
+                raise NoDataException("No data from Stooq")
+
+            bars = Bars.from_structured(bars)
+            await run_backend(
+                self.cache, self.cache.set, cache_key, (bars, time.time()), ttl=self.cache_ttl + self.stale_ttl
+            )
+            return bars
+        finally:
+            await run_backend(self.cache, lock.__exit__, None, None, None)
+
+    async def get_stock_data_async(self, symbol, period="1mo"):
+        if period not in PERIODS:
+            raise ValueError(f"Unsupported period: {period}")
+        return self._build_payload(symbol, slice_period(await self.get_bars_async(symbol), period))
+
+    async def get_many_async(self, symbols, period="1mo"):
+        if period not in PERIODS:
+            raise ValueError(f"Unsupported period: {period}")
+
+        outcomes = await asyncio.gather(
+            *(self.get_stock_data_async(symbol, period) for symbol in symbols), return_exceptions=True
+        )
+        results = {}
+        errors = {}
+        for symbol, outcome in zip(symbols, outcomes):
+            if isinstance(outcome, Exception):
+                errors[symbol] = self._batch_error(outcome)
+            else:
+                results[symbol] = outcome
+        return results, errors
+
+    async def get_live_price_async(self, symbol):
+        cache_key = f"live_{symbol}"
+        cached = await run_backend(self.cache, self.cache.get, cache_key)
+        if cached is not None:
+            return cached
+        return await self.async_flight.do(cache_key, lambda: self._fetch_live_price_async(symbol, cache_key))
+
+    async def _fetch_live_price_async(self, symbol, cache_key):
+        quote = self._quote(symbol, await self.refresh_history_async(symbol))
+        await run_backend(self.cache, self.cache.set, cache_key, quote, ttl=self.live_ttl)
+        return quote
+
+    async def bars_age_async(self, symbol):
+        cached = await run_backend(self.cache, self.cache.get, f"bars_{symbol}")
+        return None if cached is None else time.time() - cached[1]
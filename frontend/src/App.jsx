@@ -7,7 +7,7 @@ import PredictionPanel from './components/PredictionPanel'
 import AnalysisPanel from './components/AnalysisPanel'
 import LivePrice from './components/LivePrice'
 import LoadingSpinner from './components/LoadingSpinner'
-import { fetchStockData, fetchPrediction, fetchAnalysis } from './services/api'
+import { fetchStockData, fetchPrediction, fetchAnalysis, fetchAnalysisJob } from './services/api'
 
 function App() {
   const [selectedStock, setSelectedStock] = useState(null)
@@ -50,6 +50,34 @@ function App() {
     }
   }, [selectedStock])
 
+  // The AI text is generated in the background; poll until it is ready
+  // and swap it in for the rule-based text returned with the metrics. If
+  // the job is gone (404) or never finishes, the rule-based text stays and
+  // the pending marker is cleared.
+  const pollAnalysisJob = useCallback(async (jobId) => {
+    const settle = (changes) =>
+      setAnalysis((current) =>
+        current?.analysisJobId === jobId ? { ...current, ...changes } : current
+      )
+
+    for (let attempt = 0; attempt < 30; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, 2000))
+      try {
+        const job = await fetchAnalysisJob(jobId)
+        if (job.status !== 'pending') {
+          settle({ analysis: job.analysis, analysisStatus: job.status })
+          return
+        }
+      } catch (err) {
+        if (err.status === 404) {
+          settle({ analysisStatus: 'failed' })
+          return
+        }
+      }
+    }
+    settle({ analysisStatus: 'failed' })
+  }, [])
+
   const handleGetAnalysis = useCallback(async () => {
     if (!selectedStock) return
     
@@ -58,12 +86,15 @@ function App() {
       const anal = await fetchAnalysis(selectedStock.symbol)
       setAnalysis(anal)
       setActiveTab('analysis')
+      if (anal.analysisStatus === 'pending') {
+        pollAnalysisJob(anal.analysisJobId)
+      }
     } catch (err) {
       setError(err.message || 'Failed to get analysis')
     } finally {
       setLoading(false)
     }
-  }, [selectedStock])
+  }, [selectedStock, pollAnalysisJob])
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-slate-50 to-blue-50">
@@ -39,7 +39,12 @@ function AnalysisPanel({ analysis }) {
             </svg>
           </div>
           <div>
-            <h4 className="font-semibold text-gray-900 mb-2">AI Analysis</h4>
+            <h4 className="font-semibold text-gray-900 mb-2">
+              AI Analysis
+              {analysis.analysisStatus === 'pending' && (
+                <span className="ml-2 text-xs font-normal text-gray-500 animate-pulse">generating...</span>
+              )}
+            </h4>
             <p className="text-gray-700 leading-relaxed">{analysis.analysis}</p>
           </div>
         </div>
@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useCallback } from 'react'
-import { fetchLivePrice } from '../services/api'
+import { fetchLivePrice, liveStreamUrl } from '../services/api'
 
 function LivePrice({ symbol }) {
   const [liveData, setLiveData] = useState(null)
@@ -22,10 +22,38 @@ function LivePrice({ symbol }) {
   }, [symbol])
 
   useEffect(() => {
-    fetchPrice()
-    const interval = setInterval(fetchPrice, 30000)
-    return () => clearInterval(interval)
-  }, [fetchPrice])
+    if (!symbol) return
+
+    // Prefer the server-sent event stream; fall back to polling when the
+    // browser lacks EventSource or the stream is closed by the server.
+    let interval = null
+    const startPolling = () => {
+      if (interval) return
+      fetchPrice()
+      interval = setInterval(fetchPrice, 30000)
+    }
+
+    if (!window.EventSource) {
+      startPolling()
+      return () => clearInterval(interval)
+    }
+
+    const source = new EventSource(liveStreamUrl(symbol))
+    source.addEventListener('price', (event) => {
+      setLiveData(JSON.parse(event.data))
+      setLastUpdate(new Date())
+    })
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) {
+        startPolling()
+      }
+    }
+
+    return () => {
+      source.close()
+      clearInterval(interval)
+    }
+  }, [symbol, fetchPrice])
 
   if (!symbol) return null
 
@@ -50,6 +50,24 @@ export const fetchStockData = async (symbol, period = '1mo') => {
   }
 }
 
+export const fetchStocks = async (symbols, period = '1mo') => {
+  try {
+    const response = await api.get(
+      `/stocks?symbols=${symbols.map(encodeURIComponent).join(',')}&period=${period}`
+    )
+    if (!response?.data) {
+      throw new Error('Empty response from server')
+    }
+    return response.data
+  } catch (error) {
+    console.error('fetchStocks error:', error)
+    throw new Error(
+      error.response?.data?.error ||
+      'Service temporarily unavailable'
+    )
+  }
+}
+
 export const fetchLivePrice = async (symbol) => {
   try {
     const response = await api.get(`/stock/${symbol}/live`)
@@ -66,6 +84,9 @@ export const fetchLivePrice = async (symbol) => {
   }
 }
 
+export const liveStreamUrl = (symbol) =>
+  `${API_BASE_URL}/stock/${encodeURIComponent(symbol)}/stream`
+
 export const fetchPrediction = async (symbol, days = 7) => {
   try {
     const response = await api.get(
@@ -100,6 +121,24 @@ export const fetchAnalysis = async (symbol) => {
   }
 }
 
+export const fetchAnalysisJob = async (jobId) => {
+  try {
+    const response = await api.get(`/analysis/${jobId}`)
+    if (!response?.data) {
+      throw new Error('Empty response from server')
+    }
+    return response.data
+  } catch (error) {
+    console.error('fetchAnalysisJob error:', error)
+    const err = new Error(
+      error.response?.data?.error ||
+      'Service temporarily unavailable'
+    )
+    err.status = error.response?.status
+    throw err
+  }
+}
+
 export const fetchNseStocks = async () => {
   try {
     const response = await api.get('/nse/stocks')